@@ -0,0 +1,217 @@
+"""Headless HTTP API for the MedAssist RAG pipeline.
+
+Serves the same retriever, RAG prompt and OpenAI client as the Streamlit app so
+other services can call the pipeline directly and it can be scaled out behind a
+load balancer independently of the UI. Each worker process loads the retriever
+and embedding model once at startup, then swaps in newly published
+knowledge-base versions without a restart (see medassist.index_registry).
+
+Run with:
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+
+Configuration (environment):
+    OPENAI_API_KEY                    key for chat completions (and OpenAI embeddings)
+    MEDASSIST_USE_OPENAI_EMBEDDINGS   "1" to embed with OpenAI instead of SentenceTransformers
+    MEDASSIST_API_MAX_CONCURRENCY     pipeline calls in flight per worker (default 8)
+    MEDASSIST_KB_WATCH_INTERVAL       seconds between checks for a new knowledge-base version (default 30)
+
+Documents are added, replaced or removed without a rebuild through
+``PUT /documents/{doc_id}`` and ``DELETE /documents/{doc_id}``. Changes are
+applied in the worker that receives them and persisted to the change log,
+which the other workers poll and apply within MEDASSIST_KB_CHANGES_INTERVAL
+seconds (default 2).
+"""
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from medassist.client import MedicalAIClient
+from medassist.http_client import get_openai_circuit_breaker
+from medassist.index_registry import get_index_registry
+from medassist.metrics import StageTimer, get_stage_latencies, get_token_savings
+from medassist.rag import (generate_medical_rag_response, knowledge_base_version, retrieve_medical_sources,
+                           stream_medical_rag_response)
+
+MAX_CONCURRENCY = int(os.getenv("MEDASSIST_API_MAX_CONCURRENCY", "8"))
+
+
+class QueryRequest(BaseModel):
+    question: str = Field(..., min_length=1)
+    model: str = "gpt-3.5-turbo"
+    max_tokens: int = Field(512, ge=1, le=4096)
+    stream: bool = False
+    semantic_threshold: Optional[float] = Field(None, ge=0.0, le=1.0)
+    specialties: Optional[List[str]] = None
+
+
+class RetrieveRequest(BaseModel):
+    question: str = Field(..., min_length=1)
+    k: int = Field(4, ge=1, le=50)
+    specialties: Optional[List[str]] = None
+
+
+class DocumentRequest(BaseModel):
+    text: str = Field(..., min_length=1)
+    metadata: dict = Field(default_factory=dict)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    use_openai_embeddings = os.getenv("MEDASSIST_USE_OPENAI_EMBEDDINGS", "").lower() in ("1", "true", "yes")
+    api_key = os.getenv("OPENAI_API_KEY")
+
+    # Load the index and embedding model once per worker, off the event loop
+    app.state.registry = await run_in_threadpool(get_index_registry, use_openai_embeddings, api_key)
+    app.state.ai_client = MedicalAIClient(api_key, use_openai_embeddings)
+    app.state.limiter = asyncio.Semaphore(MAX_CONCURRENCY)
+    app.state.in_flight = 0
+    yield
+    app.state.registry.stop_watching()
+
+
+app = FastAPI(title="MedAssist AI API", lifespan=lifespan)
+
+
+async def _acquire():
+    """Take a concurrency slot and lease the active knowledge base for the request"""
+    await app.state.limiter.acquire()
+    app.state.in_flight += 1
+    return app.state.registry.acquire()
+
+
+def _release(generation):
+    app.state.registry.release(generation)
+    app.state.in_flight -= 1
+    app.state.limiter.release()
+
+
+def _sse(data):
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/health")
+async def health():
+    active = app.state.registry.active
+    stats = active.stats
+    return {
+        "status": "ok",
+        "kb_version": knowledge_base_version(active.retriever),
+        "kb_loading": app.state.registry.status()["loading"],
+        "total_chunks": stats["total_chunks"],
+        "embedding_model": stats["embedding_model_name"],
+        "specialties": stats["specialties"],
+        "llm_configured": app.state.ai_client.is_configured(),
+        "openai_circuit": get_openai_circuit_breaker().snapshot()["state"],
+        "max_concurrency": MAX_CONCURRENCY,
+        "in_flight": app.state.in_flight,
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Per-stage p50/p95/p99 latency and prompt tokens saved, for this worker."""
+    return {"stages": get_stage_latencies().summary(), "adaptive_depth": get_token_savings().stats()}
+
+
+@app.post("/retrieve")
+async def retrieve(request: RetrieveRequest):
+    generation = await _acquire()
+    try:
+        retriever = generation.retriever.filtered(request.specialties)
+        sources = await run_in_threadpool(retrieve_medical_sources, retriever, request.question, request.k)
+    finally:
+        _release(generation)
+    return {"sources": sources, "kb_version": knowledge_base_version(generation.retriever)}
+
+
+@app.post("/query")
+async def query(request: QueryRequest):
+    if not app.state.ai_client.is_configured():
+        raise HTTPException(status_code=503, detail="OpenAI API key not configured")
+
+    timer = StageTimer(get_stage_latencies())
+
+    if not request.stream:
+        generation = await _acquire()
+        try:
+            answer, sources = await run_in_threadpool(
+                generate_medical_rag_response,
+                app.state.ai_client,
+                generation.retriever.filtered(request.specialties),
+                request.question,
+                request.model,
+                request.max_tokens,
+                request.semantic_threshold,
+                timer
+            )
+        finally:
+            _release(generation)
+
+        if answer.startswith("❌"):
+            raise HTTPException(status_code=502, detail=answer)
+        return {
+            "answer": answer,
+            "sources": sources,
+            "model": request.model,
+            "kb_version": knowledge_base_version(generation.retriever),
+            "timings_ms": timer.breakdown_ms(),
+        }
+
+    # Streaming: the concurrency slot and knowledge-base lease are held until the last event is sent
+    generation = await _acquire()
+    try:
+        sources, deltas = await run_in_threadpool(
+            stream_medical_rag_response,
+            app.state.ai_client,
+            generation.retriever.filtered(request.specialties),
+            request.question,
+            request.model,
+            request.max_tokens,
+            request.semantic_threshold,
+            timer
+        )
+    except BaseException:
+        _release(generation)
+        raise
+
+    async def events():
+        try:
+            yield _sse({"sources": sources, "kb_version": knowledge_base_version(generation.retriever)})
+            async for delta in iterate_in_threadpool(deltas):
+                yield _sse({"delta": delta})
+            yield _sse({"timings_ms": timer.breakdown_ms()})
+            yield "data: [DONE]\n\n"
+        finally:
+            _release(generation)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.put("/documents/{doc_id:path}")
+async def upsert_document(doc_id: str, request: DocumentRequest):
+    """Add or replace one document in the active knowledge base; only its chunks are re-embedded.
+
+    ``metadata`` is merged over a replaced document's, so omitted fields such as ``specialty`` are kept.
+    """
+    with app.state.registry.lease() as (retriever, _):
+        result = await run_in_threadpool(retriever.delta.upsert, doc_id, request.text, request.metadata)
+        result["kb_version"] = knowledge_base_version(retriever)
+    return result
+
+
+@app.delete("/documents/{doc_id:path}")
+async def delete_document(doc_id: str):
+    with app.state.registry.lease() as (retriever, _):
+        try:
+            result = await run_in_threadpool(retriever.delta.delete, doc_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown document {doc_id}")
+        result["kb_version"] = knowledge_base_version(retriever)
+    return result
@@ -1,21 +1,23 @@
 import streamlit as st
 import os
 import warnings
-import time
-import json
-import requests
-import tempfile
 from datetime import datetime
 warnings.filterwarnings("ignore")
 
-import tiktoken
-import pandas as pd
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyMuPDFLoader, TextLoader
-from langchain_community.embeddings.sentence_transformer import SentenceTransformerEmbeddings
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain.schema import Document
+# Only light modules are imported here so the page paints immediately; FAISS,
+# LangChain and the embedding models load on a background thread (see medassist.warmup)
+from medassist.client import MedicalAIClient
+from medassist.http_client import get_openai_circuit_breaker
+from medassist.metrics import get_token_savings
+from medassist.index_registry import get_index_registry
+from medassist.rag import DEFAULT_SEMANTIC_THRESHOLD, knowledge_base_version, stream_medical_rag_response
+from medassist.response_cache import get_response_cache
+from medassist.semantic_cache import get_semantic_cache
+from medassist.warmup import get_index_warmup
+
+# Start loading the default knowledge base (local embeddings) as soon as the server
+# runs the script, so the first visitor is not blocked by the build
+get_index_warmup(False, os.getenv('OPENAI_API_KEY'))
 
 st.set_page_config(
     page_title="MedAssist AI - Medical RAG Assistant",
@@ -950,259 +952,51 @@ if "query_count" not in st.session_state:
 if "session_start" not in st.session_state:
     st.session_state.session_start = datetime.now()
 
-class MedicalAIClient:
-    def __init__(self, api_key, use_openai_embeddings=False):
-        self.api_key = api_key
-        self.use_openai_embeddings = use_openai_embeddings
-    
-    def is_configured(self):
-        return bool(self.api_key and self.api_key.startswith('sk-'))
-    
-    def generate(self, prompt, model="gpt-3.5-turbo", max_tokens=512):
-        if not self.is_configured():
-            return "❌ OpenAI API key not configured"
-        
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": max_tokens,
-                "temperature": 0
-            }
-            
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"].strip()
-            elif response.status_code == 401:
-                return "❌ Invalid API key. Please check your OpenAI API key."
-            elif response.status_code == 429:
-                return "❌ Rate limit exceeded. Please try again in a moment."
-            else:
-                return f"❌ OpenAI API Error: {response.status_code}"
-                
-        except Exception as e:
-            return f"❌ Connection Error: {str(e)}"
-
-@st.cache_data
-def load_comprehensive_medical_knowledge():
-    """Load comprehensive medical knowledge base"""
-    medical_docs = [
-        # Cardiovascular Conditions
-        "Myocardial infarction (heart attack) presents with chest pain that may radiate to the left arm, jaw, or back. Associated symptoms include shortness of breath, nausea, sweating, and anxiety. ST-elevation MI (STEMI) requires immediate primary PCI or thrombolytic therapy within 90 minutes. Non-ST elevation MI (NSTEMI) is managed with antiplatelet therapy, anticoagulation, and risk stratification. Key medications include aspirin, clopidogrel, atorvastatin, metoprolol, and ACE inhibitors. Complications include arrhythmias, heart failure, and mechanical complications.",
-        
-        "Hypertension is defined as systolic BP ≥140 mmHg or diastolic BP ≥90 mmHg on repeated measurements. Stage 1 hypertension is 130-139/80-89 mmHg. First-line treatments include ACE inhibitors (lisinopril), ARBs (losartan), thiazide diuretics (hydrochlorothiazide), and calcium channel blockers (amlodipine). Lifestyle modifications include sodium restriction (<2.3g/day), weight loss, regular exercise, and alcohol moderation. Target BP is <130/80 mmHg for most patients.",
-        
-        "Heart failure with reduced ejection fraction (HFrEF) is treated with ACE inhibitors or ARBs, beta-blockers (metoprolol, carvedilol), and mineralocorticoid receptor antagonists (spironolactone). Newer therapies include SGLT2 inhibitors (dapagliflozin) and ARNI (sacubitril/valsartan). Diuretics manage volume overload. Symptoms include dyspnea on exertion, orthopnea, paroxysmal nocturnal dyspnea, and peripheral edema. NYHA classification grades functional capacity from I to IV.",
-        
-        # Endocrine Disorders
-        "Type 2 diabetes mellitus is diagnosed with fasting glucose ≥126 mg/dL, HbA1c ≥6.5%, or random glucose ≥200 mg/dL with symptoms. Metformin is first-line therapy unless contraindicated. Second-line options include sulfonylureas, DPP-4 inhibitors, GLP-1 agonists, SGLT2 inhibitors, and insulin. Target HbA1c is <7% for most adults. Complications include diabetic nephropathy, retinopathy, neuropathy, and accelerated cardiovascular disease. Annual screening includes eye exams, kidney function, and foot examinations.",
-        
-        "Diabetic ketoacidosis (DKA) presents with hyperglycemia >250 mg/dL, ketosis, and metabolic acidosis. Symptoms include polyuria, polydipsia, nausea, vomiting, and altered mental status. Treatment includes IV fluid resuscitation, insulin infusion, electrolyte replacement (especially potassium), and correction of precipitating factors. Common triggers include infection, medication non-compliance, and new-onset diabetes. Monitor for complications including cerebral edema in children.",
-        
-        "Thyroid disorders: Hyperthyroidism presents with weight loss, palpitations, heat intolerance, and tremor. Graves' disease is the most common cause. Treatment includes anti-thyroid medications (methimazole, propylthiouracil), radioactive iodine, or surgery. Hypothyroidism presents with fatigue, weight gain, cold intolerance, and bradycardia. Treatment is levothyroxine replacement with TSH monitoring every 6-8 weeks until stable.",
-        
-        # Respiratory Conditions
-        "Community-acquired pneumonia (CAP) presents with fever, productive cough, pleuritic chest pain, and dyspnea. CURB-65 score helps determine severity and treatment setting. Outpatient treatment includes amoxicillin or azithromycin. Hospitalized patients receive ceftriaxone plus azithromycin or respiratory fluoroquinolone (levofloxacin). Chest X-ray shows consolidation. Complications include pleural effusion, empyema, and respiratory failure.",
-        
-        "Asthma exacerbation presents with wheezing, shortness of breath, chest tightness, and coughing. Peak flow <50% of personal best indicates severe exacerbation. Treatment includes oxygen, bronchodilators (albuterol), corticosteroids (prednisone or methylprednisolone), and magnesium sulfate for severe cases. Controller medications include inhaled corticosteroids (fluticasone), long-acting beta-agonists (salmeterol), and leukotriene inhibitors (montelukast).",
-        
-        "Chronic obstructive pulmonary disease (COPD) is characterized by airflow limitation due to emphysema and chronic bronchitis. Smoking cessation is the most important intervention. Bronchodilators include short-acting (albuterol) and long-acting (tiotropium) agents. Inhaled corticosteroids are added for frequent exacerbations. Oxygen therapy is indicated for severe hypoxemia. Exacerbations are treated with bronchodilators, corticosteroids, and antibiotics if bacterial infection is suspected.",
-        
-        # Infectious Diseases
-        "Sepsis is life-threatening organ dysfunction due to dysregulated host response to infection. qSOFA score includes altered mental status, systolic BP ≤100 mmHg, and respiratory rate ≥22/min. Treatment follows the sepsis bundle: obtain blood cultures, administer broad-spectrum antibiotics within 1 hour, and provide IV fluid resuscitation. Vasopressors (norepinephrine) are used for shock. Source control is essential. Procalcitonin may guide antibiotic duration.",
-        
-        "Urinary tract infection (UTI) presents with dysuria, frequency, urgency, and suprapubic pain. Uncomplicated cystitis in women is treated with nitrofurantoin, trimethoprim-sulfamethoxazole, or fosfomycin. Complicated UTIs and pyelonephritis require fluoroquinolones or cephalosporins. Urine culture is indicated for recurrent infections, treatment failures, or complicated cases. Pregnant women require treatment even for asymptomatic bacteriuria.",
-        
-        "Antibiotic selection: Penicillins (amoxicillin) for streptococcal infections, cephalosporins (cephalexin) for skin and soft tissue, fluoroquinolones (ciprofloxacin) for gram-negative infections, macrolides (azithromycin) for atypical pathogens, and vancomycin for MRSA. Beta-lactam allergies require alternative agents. C. difficile colitis is a serious complication of antibiotic use requiring metronidazole or vancomycin.",
-        
-        # Emergency Medicine
-        "Anaphylaxis is a severe allergic reaction requiring immediate epinephrine 0.3-0.5mg IM in the anterolateral thigh. Symptoms include difficulty breathing, facial/throat swelling, urticaria, gastrointestinal symptoms, and cardiovascular collapse. Additional treatments include H1 antihistamines (diphenhydramine), H2 blockers (ranitidine), corticosteroids (methylprednisolone), and bronchodilators. Biphasic reactions can occur 4-12 hours later. Common triggers include foods (nuts, shellfish), medications (penicillin), and insect stings.",
-        
-        "Acute stroke symptoms follow FAST assessment: Face drooping, Arm weakness, Speech difficulty, Time to call emergency services. CT scan differentiates ischemic from hemorrhagic stroke. Ischemic stroke treatment includes IV tPA within 4.5 hours if no contraindications, and mechanical thrombectomy within 24 hours for large vessel occlusion. Blood pressure management is crucial - avoid aggressive reduction in acute ischemic stroke.",
-        
-        "Acute coronary syndrome (ACS) includes STEMI, NSTEMI, and unstable angina. Initial management includes aspirin, clopidogrel, atorvastatin, metoprolol, and anticoagulation with heparin. STEMI requires primary PCI within 90 minutes or fibrinolytic therapy within 30 minutes if PCI unavailable. NSTEMI is managed with risk stratification using TIMI or GRACE scores. Troponin levels help diagnose myocardial injury.",
-        
-        # Gastroenterology
-        "Gastroesophageal reflux disease (GERD) presents with heartburn, regurgitation, and chest pain. Complications include Barrett's esophagus and adenocarcinoma. Proton pump inhibitors (omeprazole, pantoprazole) are first-line therapy. H2 receptor blockers (ranitidine) are less effective. Lifestyle modifications include weight loss, elevation of head of bed, and avoiding trigger foods. Endoscopy is indicated for alarm symptoms or failed medical therapy.",
-        
-        "Peptic ulcer disease is caused by H. pylori infection or NSAIDs. Triple therapy for H. pylori includes PPI + clarithromycin + amoxicillin for 14 days. Quadruple therapy adds metronidazole. NSAID-induced ulcers are treated with PPIs and NSAID discontinuation. Bleeding ulcers may require endoscopic intervention. Complications include perforation and gastric outlet obstruction.",
-        
-        # Pharmacology
-        "Metformin is first-line therapy for type 2 diabetes with multiple benefits including weight neutrality and cardiovascular protection. Contraindications include severe kidney disease (eGFR <30), liver disease, heart failure, and conditions predisposing to lactic acidosis. Common side effects include gastrointestinal upset and vitamin B12 deficiency. Dose adjustment is required for eGFR 30-45 mL/min/1.73m². Maximum dose is 2550mg daily divided with meals.",
-        
-        "ACE inhibitors (lisinopril, enalapril) are first-line for hypertension and heart failure. Benefits include renal protection in diabetes and post-MI mortality reduction. Side effects include dry cough (10-15%), hyperkalemia, and angioedema (rare but serious). ARBs (losartan, valsartan) have similar efficacy with lower cough incidence. Monitor kidney function and potassium levels. Contraindicated in pregnancy.",
-        
-        "Warfarin is a vitamin K antagonist requiring INR monitoring. Target INR is 2-3 for most indications, 2.5-3.5 for mechanical heart valves. Drug interactions are numerous, especially with antibiotics and antifungals. Dietary vitamin K intake should be consistent. Reversal agents include vitamin K, fresh frozen plasma, and prothrombin complex concentrate. Novel oral anticoagulants (DOACs) like rivaroxaban require less monitoring.",
-        
-        # Mental Health
-        "Major depressive disorder is diagnosed with ≥5 symptoms for ≥2 weeks including depressed mood or anhedonia. SSRIs (sertraline, escitalopram) are first-line therapy with 4-6 week trial periods. SNRIs (venlafaxine) are alternatives. Suicide risk assessment is essential. Psychotherapy, particularly CBT, is equally effective. Combination therapy may be superior for severe depression. Monitor for activation symptoms in young adults.",
-        
-        "Anxiety disorders include generalized anxiety disorder, panic disorder, and social anxiety. SSRIs and SNRIs are first-line treatments. Benzodiazepines (lorazepam, alprazolam) provide rapid relief but have addiction potential. CBT and exposure therapy are effective non-pharmacological treatments. Beta-blockers (propranolol) help with performance anxiety. Avoid alcohol and caffeine which can worsen symptoms."
-    ]
-    
-    return medical_docs
-
-@st.cache_resource
-def setup_medical_vectorstore(use_openai_embeddings=False, api_key=None):
-    """Setup medical knowledge base with FAISS"""
+def activate_knowledge_base(warmup):
+    """Attach a finished background build to this session; returns the index registry or None"""
     try:
-        progress_container = st.container()
-        with progress_container:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            status_text.markdown('<div class="loading-indicator">📄 Loading comprehensive medical knowledge...</div>', unsafe_allow_html=True)
-            progress_bar.progress(20)
-        
-        # Load medical documents
-        medical_docs_text = load_comprehensive_medical_knowledge()
-        
-        # Convert to Document objects
-        documents = [Document(page_content=doc, metadata={"source": f"medical_knowledge_{i}"}) 
-                    for i, doc in enumerate(medical_docs_text)]
-        
-        progress_bar.progress(40)
-        status_text.markdown('<div class="loading-indicator">✂️ Processing medical content...</div>', unsafe_allow_html=True)
-        
-        # Split documents into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=800,
-            chunk_overlap=100,
-            length_function=len
-        )
-        
-        document_chunks = text_splitter.split_documents(documents)
-        
-        progress_bar.progress(60)
-        status_text.markdown('<div class="loading-indicator">🧮 Creating medical embeddings...</div>', unsafe_allow_html=True)
-        
-        # Choose embedding model
-        if use_openai_embeddings and api_key:
-            embedding_model = OpenAIEmbeddings(
-                openai_api_key=api_key,
-                model="text-embedding-ada-002"
-            )
-        else:
-            embedding_model = SentenceTransformerEmbeddings(
-                model_name="all-MiniLM-L6-v2"
-            )
-        
-        progress_bar.progress(80)
-        status_text.markdown('<div class="loading-indicator">🗄️ Building FAISS vector store...</div>', unsafe_allow_html=True)
-        
-        # Create FAISS vector store
-        vectorstore = FAISS.from_documents(
-            documents=document_chunks,
-            embedding=embedding_model
-        )
-        
-        # Create retriever
-        retriever = vectorstore.as_retriever(
-            search_type='similarity',
-            search_kwargs={'k': 4}
-        )
-        
-        progress_bar.progress(100)
-        status_text.markdown('<div class="status-card status-success"><div class="status-text"><span class="status-icon">✅</span>Medical knowledge base ready!</div></div>', unsafe_allow_html=True)
-        
-        # Store stats
-        st.session_state.total_chunks = len(document_chunks)
-        st.session_state.total_topics = len(medical_docs_text)
-        st.session_state.embedding_model = "OpenAI" if use_openai_embeddings else "SentenceTransformer"
-        
-        time.sleep(1.5)
-        progress_bar.empty()
-        status_text.empty()
-        
-        return retriever
-        
+        warmup.result()
     except Exception as e:
         st.error(f"❌ Failed to setup knowledge base: {str(e)}")
         return None
+    
+    # Sessions hold the registry, not a retriever, so a newly published version is picked up without a restart
+    registry = get_index_registry(warmup.use_openai_embeddings, warmup.api_key)
+    st.session_state.index_registry = registry
+    st.session_state.system_initialized = True
+    
+    return registry
 
-def count_tokens(text):
-    enc = tiktoken.get_encoding("cl100k_base")
-    return len(enc.encode(text))
-
-def generate_medical_rag_response(ai_client, retriever, user_input, model="gpt-3.5-turbo", max_tokens=512):
-    """Generate RAG response using FAISS vector search"""
-    system_message = """You are MedAssist AI, an advanced medical AI assistant with access to comprehensive medical knowledge.
-
-GUIDELINES:
-- Answer based ONLY on the provided medical context from your knowledge base
-- Structure responses clearly with relevant medical sections when appropriate
-- Use appropriate medical terminology while remaining accessible to healthcare professionals
-- If the context lacks specific information, acknowledge this limitation clearly
-- For treatment questions, present evidence-based options systematically
-- Include relevant dosages, contraindications, and monitoring parameters when discussing medications
-- Always emphasize consulting with healthcare professionals for diagnosis and treatment decisions
-- Provide differential diagnoses when relevant
-
-RESPONSE FORMAT:
-- Use clear headings when appropriate (## Symptoms, ## Diagnosis, ## Treatment, ## Monitoring)
-- Use bullet points for lists of symptoms, treatments, or differential diagnoses
-- **Bold** key medical terms, conditions, and medications
-- Include specific dosages and clinical guidelines when available"""
-
-    try:
-        # Retrieve relevant documents from FAISS
-        relevant_docs = retriever.get_relevant_documents(query=user_input)
-        
-        if not relevant_docs:
-            return "⚠️ No relevant medical information found in the knowledge base for this query."
-        
-        # Combine context from retrieved documents
-        context_list = [doc.page_content for doc in relevant_docs]
-        context = "\n\n---\n\n".join(context_list)
-        
-        # Ensure context fits within token limits
-        max_context_tokens = 2000
-        if count_tokens(context) > max_context_tokens:
-            # Truncate context while preserving complete sentences
-            sentences = context.split('. ')
-            truncated_context = ""
-            current_tokens = 0
-            
-            for sentence in sentences:
-                sentence_tokens = count_tokens(sentence + '. ')
-                if current_tokens + sentence_tokens <= max_context_tokens:
-                    truncated_context += sentence + '. '
-                    current_tokens += sentence_tokens
-                else:
-                    break
-            context = truncated_context
-        
-        prompt = f"""{system_message}
-
-MEDICAL CONTEXT FROM KNOWLEDGE BASE:
-{context}
+def show_warmup_progress(warmup, progress_bar, status_text):
+    status = warmup.status()
+    progress_bar.progress(status["percent"])
+    status_text.markdown(f'<div class="loading-indicator">{status["message"]}</div>', unsafe_allow_html=True)
 
-HEALTHCARE PROFESSIONAL QUESTION:
-{user_input}
+def wait_for_knowledge_base(warmup, progress_bar, status_text):
+    """Keep the build progress live until the index is ready; returns the index registry or None"""
+    while not warmup.wait(0.25):
+        show_warmup_progress(warmup, progress_bar, status_text)
+    progress_bar.empty()
+    status_text.empty()
+    return activate_knowledge_base(warmup)
 
-MEDICAL RESPONSE (based only on the provided context):"""
-        
-        # Generate response using AI
-        response = ai_client.generate(prompt, model=model, max_tokens=max_tokens)
-        
-        if not response.startswith("❌"):
-            response += "\n\n---\n*Response based on medical knowledge base. Always verify with current medical literature and clinical guidelines.*"
-        
-        return response
-        
-    except Exception as e:
-        return f'❌ Error generating medical response: {str(e)}'
+def render_chat_message(role, content, container=None):
+    """Render one chat bubble, optionally into an existing placeholder"""
+    target = container if container is not None else st
+    if role == "user":
+        target.markdown(f"""
+        <div class="user-message">
+            <div class="message-label">Healthcare Professional</div>
+            <div class="message-content">{content}</div>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        target.markdown(f"""
+        <div class="assistant-message">
+            <div class="message-label">MedAssist AI</div>
+            <div class="message-content markdown-content">{content}</div>
+        </div>
+        """, unsafe_allow_html=True)
 
 def main():
     # Show onboarding for first-time users
@@ -1283,12 +1077,52 @@ def main():
         else:
             st.markdown('<div class="status-card status-warning"><div class="status-text"><span class="status-icon">⚠️</span>Please add your OpenAI API key</div></div>', unsafe_allow_html=True)
         
+        # Upstream health, shared by all sessions in this process
+        breaker = get_openai_circuit_breaker().snapshot()
+        if breaker["state"] == "open":
+            st.markdown(f'<div class="status-card status-error"><div class="status-text"><span class="status-icon">🔴</span>OpenAI API degraded – pausing requests ({breaker["retry_in"]:.0f}s)</div></div>', unsafe_allow_html=True)
+        elif breaker["state"] == "half-open":
+            st.markdown('<div class="status-card status-warning"><div class="status-text"><span class="status-icon">🟡</span>OpenAI API recovering – testing connection</div></div>', unsafe_allow_html=True)
+        elif breaker["failures"]:
+            st.markdown(f'<div class="status-card status-warning"><div class="status-text"><span class="status-icon">🟠</span>OpenAI API: {breaker["failures"]} recent failure(s)</div></div>', unsafe_allow_html=True)
+        else:
+            st.markdown('<div class="status-card"><div class="status-text"><span class="status-icon">🟢</span>OpenAI API healthy</div></div>', unsafe_allow_html=True)
+        
         st.markdown('</div>', unsafe_allow_html=True)
         
         max_tokens = st.slider("Response Length", 256, 1024, 512)
+        
+        use_response_cache = st.checkbox(
+            "Use response cache",
+            value=True,
+            help="Answer identical requests from the on-disk cache. Uncheck to always call the OpenAI API."
+        )
+        response_stats = get_response_cache().stats()
+        st.caption(f"💾 Response cache: {response_stats['hits']} hits / {response_stats['misses']} misses "
+                   f"({response_stats['entries']} stored)")
+        
+        use_semantic_cache = st.checkbox(
+            "Reuse answers to similar questions",
+            value=True,
+            help="Serve a stored answer when a near-identical question was already asked for the same model and knowledge base."
+        )
+        semantic_threshold = st.slider(
+            "Similarity Threshold",
+            0.80, 1.00, DEFAULT_SEMANTIC_THRESHOLD, 0.01,
+            disabled=not use_semantic_cache,
+            help="Minimum cosine similarity between questions for an answer to be reused"
+        )
+        cache_stats = get_semantic_cache().stats()
+        st.caption(f"⚡ Answer cache: {cache_stats['hit_rate']:.0%} hit rate "
+                   f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']} lookups, {cache_stats['entries']} stored)")
+        
+        savings = get_token_savings().stats()
+        if savings["queries"]:
+            st.caption(f"✂️ Adaptive retrieval: {savings['avg_tokens_saved']:.0f} prompt tokens saved per query "
+                       f"({savings['chunks_dropped']} low-relevance chunks dropped)")
     
     # Initialize AI client
-    ai_client = MedicalAIClient(api_key, use_openai_embeddings)
+    ai_client = MedicalAIClient(api_key, use_openai_embeddings, use_response_cache=use_response_cache)
     
     # System status with enhanced cards
     col1, col2, col3 = st.columns(3)
@@ -1306,34 +1140,61 @@ def main():
     with col3:
         st.markdown(f'<div class="status-card"><div class="status-text"><span class="status-icon">💬</span>Queries: {st.session_state.query_count}</div></div>', unsafe_allow_html=True)
     
-    # Initialize knowledge base with enhanced loading experience
+    # The knowledge base builds in the background; the page stays usable meanwhile
+    warmup = None
+    loading = None
     if not st.session_state.system_initialized:
         if not api_key and use_openai_embeddings:
             st.markdown('<div class="status-card status-warning"><div class="status-text"><span class="status-icon">⚠️</span>OpenAI API key required for OpenAI embeddings. Using SentenceTransformers instead.</div></div>', unsafe_allow_html=True)
             use_openai_embeddings = False
         
-        with st.spinner("🚀 Initializing medical knowledge base with FAISS..."):
-            retriever = setup_medical_vectorstore(use_openai_embeddings, api_key)
-            if retriever:
-                st.session_state.retriever = retriever
-                st.session_state.system_initialized = True
+        warmup = get_index_warmup(use_openai_embeddings, api_key)
+        if warmup.wait(0):
+            if activate_knowledge_base(warmup):
                 st.markdown('<div class="status-card status-success"><div class="status-text"><span class="status-icon">✅</span>MedAssist AI is ready for medical consultations!</div></div>', unsafe_allow_html=True)
-                time.sleep(1)
-                st.rerun()
+        else:
+            with st.container():
+                loading = (st.progress(0), st.empty())
+            show_warmup_progress(warmup, *loading)
     
     # Sidebar info with enhanced styling
     with st.sidebar:
-        if hasattr(st.session_state, 'total_chunks'):
+        if hasattr(st.session_state, 'index_registry'):
+            registry = st.session_state.index_registry
+            active = registry.active
+            # Counts are re-read on every render, so document updates show up without a restart
+            stats = active.stats
+            status = registry.status()
             st.markdown('<div class="sidebar-config" style="margin-top: 2rem;">', unsafe_allow_html=True)
             st.markdown('<div class="config-title">📊 Knowledge Base</div>', unsafe_allow_html=True)
             col_a, col_b = st.columns(2)
             with col_a:
-                st.metric("Topics", st.session_state.total_topics)
+                st.metric("Topics", stats["total_topics"])
             with col_b:
-                st.metric("Chunks", st.session_state.total_chunks)
+                st.metric("Chunks", stats["total_chunks"])
+            
+            st.markdown(f'<div class="status-card"><div class="status-text"><span class="status-icon">🔬</span>Using: {stats["embedding_model"]}</div></div>', unsafe_allow_html=True)
             
-            if hasattr(st.session_state, 'embedding_model'):
-                st.markdown(f'<div class="status-card"><div class="status-text"><span class="status-icon">🔬</span>Using: {st.session_state.embedding_model}</div></div>', unsafe_allow_html=True)
+            # Active version (with document updates applied since it was built) and when it went live
+            kb_version, _, revision = knowledge_base_version(active.retriever).partition('+')
+            version_label = f"{kb_version[:12]}+{revision}" if revision else kb_version[:12]
+            loaded_at = datetime.fromtimestamp(active.loaded_at).strftime('%Y-%m-%d %H:%M')
+            st.markdown(f'<div class="status-card"><div class="status-text"><span class="status-icon">🏷️</span>Version: {version_label} · {loaded_at}</div></div>', unsafe_allow_html=True)
+            if status["loading"]:
+                st.markdown(f'<div class="status-card status-warning"><div class="status-text"><span class="status-icon">🔄</span>Loading version {status["loading"][:12]}...</div></div>', unsafe_allow_html=True)
+            
+            # Optional specialty filter: filtered questions search only those specialties' sub-indexes
+            specialties = stats.get("specialties", {})
+            if specialties:
+                # A newly swapped-in version may no longer have a previously selected specialty
+                st.session_state.specialty_filter = [specialty for specialty in st.session_state.get("specialty_filter", []) if specialty in specialties]
+                st.multiselect(
+                    "Filter by specialty",
+                    list(specialties),
+                    key="specialty_filter",
+                    format_func=lambda specialty: f"{specialty.replace('_', ' ').title()} ({specialties[specialty]} chunks)",
+                    help="Answer only from the selected specialties. Leave empty to search the whole knowledge base."
+                )
             st.markdown('</div>', unsafe_allow_html=True)
         
         st.markdown('<div class="sample-questions">', unsafe_allow_html=True)
@@ -1393,20 +1254,7 @@ def main():
     
     # Display chat history
     for message in st.session_state.messages:
-        if message["role"] == "user":
-            st.markdown(f"""
-            <div class="user-message">
-                <div class="message-label">Healthcare Professional</div>
-                <div class="message-content">{message["content"]}</div>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="assistant-message">
-                <div class="message-label">MedAssist AI</div>
-                <div class="message-content markdown-content">{message["content"]}</div>
-            </div>
-            """, unsafe_allow_html=True)
+        render_chat_message(message["role"], message["content"])
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -1418,7 +1266,7 @@ def main():
         user_input = st.session_state.user_input
         del st.session_state.user_input
     
-    if user_input and st.session_state.system_initialized:
+    if user_input:
         if not ai_client.is_configured():
             st.markdown('<div class="status-card status-error"><div class="status-text"><span class="status-icon">❌</span>Please configure your OpenAI API key first!</div></div>', unsafe_allow_html=True)
             return
@@ -1426,59 +1274,75 @@ def main():
         st.session_state.messages.append({"role": "user", "content": user_input})
         st.session_state.query_count += 1
         
-        with st.spinner("🔍 Consulting medical knowledge base with FAISS..."):
-            # Add a subtle loading animation
-            loading_placeholder = st.empty()
-            loading_placeholder.markdown('<div class="loading-indicator">🤔 Analyzing your medical query...</div>', unsafe_allow_html=True)
-            
-            response = generate_medical_rag_response(
+        render_chat_message("user", user_input)
+        
+        # Stream the answer into its chat bubble as tokens arrive
+        response_placeholder = st.empty()
+        
+        # A question asked while the index is still building waits for it
+        if not st.session_state.system_initialized:
+            response_placeholder.markdown('<div class="loading-indicator">⏳ Your question is queued until the medical knowledge base finishes loading...</div>', unsafe_allow_html=True)
+            if loading is None or not wait_for_knowledge_base(warmup, *loading):
+                return
+        
+        response_placeholder.markdown('<div class="loading-indicator">🔍 Consulting medical knowledge base with FAISS...</div>', unsafe_allow_html=True)
+        
+        # The lease keeps this answer on one knowledge-base version even if a new one is swapped in meanwhile
+        with st.session_state.index_registry.lease() as (retriever, _):
+            sources, deltas = stream_medical_rag_response(
                 ai_client, 
-                st.session_state.retriever, 
+                retriever.filtered(st.session_state.get("specialty_filter")), 
                 user_input, 
                 model=model, 
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                semantic_threshold=semantic_threshold if use_semantic_cache else None
             )
             
-            loading_placeholder.empty()
+            response = ""
+            for delta in deltas:
+                response += delta
+                render_chat_message("assistant", response + "▌", container=response_placeholder)
+        
+        render_chat_message("assistant", response, container=response_placeholder)
         
-        st.session_state.messages.append({"role": "assistant", "content": response})
+        # Keep the retrieved chunks with the answer so the sources panel never re-queries FAISS
+        st.session_state.messages.append({"role": "assistant", "content": response, "sources": sources})
         st.rerun()
     
     # Show knowledge sources if response exists with enhanced styling
     if st.session_state.messages and st.session_state.system_initialized:
         with st.expander("🔍 View Knowledge Sources & Citations"):
-            if st.session_state.messages:
-                last_question = [msg for msg in st.session_state.messages if msg["role"] == "user"]
-                if last_question:
-                    docs = st.session_state.retriever.get_relevant_documents(last_question[-1]["content"])
-                    
-                    # Add relevance scores and better formatting
-                    st.markdown("<h4>📚 Most Relevant Medical Sources</h4>", unsafe_allow_html=True)
+            answers = [msg for msg in st.session_state.messages if msg["role"] == "assistant"]
+            if answers:
+                sources = answers[-1].get("sources", [])
+                
+                # Add relevance scores and better formatting
+                st.markdown("<h4>📚 Most Relevant Medical Sources</h4>", unsafe_allow_html=True)
+                
+                for i, source in enumerate(sources[:5]):  # Limit to top 5 sources
+                    # Similarity score from the same search that produced the answer
+                    relevance = f"{max(0.0, min(1.0, source['score'])):.0%}"
                     
-                    for i, doc in enumerate(docs[:5]):  # Limit to top 5 sources
-                        # Calculate simple relevance score (you can improve this)
-                        relevance = f"{(5-i)*20}%"
-                        
-                        st.markdown(f"""
-                        <div class="knowledge-source" style="animation: fadeInUp 0.5s ease-out {0.1 * i}s both;">
-                            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
-                                <div class="source-label">📖 Source {i+1}</div>
-                                <div style="color: var(--chestnut); font-weight: bold;">Relevance: {relevance}</div>
-                            </div>
-                            <div class="source-content">
-                                <div style="margin-bottom: 0.5rem; font-style: italic; color: #666;">
-                                    {doc.metadata.get('source', 'Medical Knowledge Base')}
-                                </div>
-                                {doc.page_content[:500]}...
+                    st.markdown(f"""
+                    <div class="knowledge-source" style="animation: fadeInUp 0.5s ease-out {0.1 * i}s both;">
+                        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
+                            <div class="source-label">📖 Source {i+1}</div>
+                            <div style="color: var(--chestnut); font-weight: bold;">Relevance: {relevance}</div>
+                        </div>
+                        <div class="source-content">
+                            <div style="margin-bottom: 0.5rem; font-style: italic; color: #666;">
+                                {source['source']}{f" · {source['specialty'].replace('_', ' ').title()}" if source.get('specialty') else ""}
                             </div>
-                            <details style="margin-top: 1rem;">
-                                <summary style="cursor: pointer; color: var(--chestnut); font-weight: 500;">View Full Context</summary>
-                                <div style="padding: 1rem; background: rgba(0,0,0,0.02); border-radius: 8px; margin-top: 0.5rem;">
-                                    {doc.page_content}
-                                </div>
-                            </details>
+                            {source['content'][:500]}...
                         </div>
-                        """, unsafe_allow_html=True)
+                        <details style="margin-top: 1rem;">
+                            <summary style="cursor: pointer; color: var(--chestnut); font-weight: 500;">View Full Context</summary>
+                            <div style="padding: 1rem; background: rgba(0,0,0,0.02); border-radius: 8px; margin-top: 0.5rem;">
+                                {source['content']}
+                            </div>
+                        </details>
+                    </div>
+                    """, unsafe_allow_html=True)
     
     # Medical disclaimer with enhanced styling
     st.markdown("""
@@ -1489,6 +1353,10 @@ def main():
         Always consult with qualified healthcare professionals for medical decisions. In case of medical emergencies, contact emergency services immediately.</div>
     </div>
     """, unsafe_allow_html=True)
+    
+    # Keep the loading progress live; a question submitted meanwhile interrupts this run
+    if loading is not None and wait_for_knowledge_base(warmup, *loading):
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
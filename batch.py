@@ -0,0 +1,163 @@
+"""Answer a JSONL file of questions offline through the RAG pipeline.
+
+Questions are retrieved in batches (one embedding call and one FAISS search per
+batch) and answered by a bounded pool of concurrent LLM calls; the next batch is
+retrieved while the previous one is still being answered. Each result is
+appended to the output JSONL as soon as it completes, so a crashed run can be
+resumed: IDs already answered successfully in the output are skipped.
+
+Usage:
+    python batch.py questions.jsonl answers.jsonl --concurrency 8
+    python batch.py requests.jsonl answers.jsonl --id-field request_id --question-field body
+
+Each input line is a JSON object with an ID and a question field. Output lines
+carry the ID, question, answer, sources and latency (including the question's
+share of its batch's retrieval time); failed answers are written
+with an "error" field and retried on the next run.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from medassist.client import MedicalAIClient
+from medassist.metrics import StageTimer, get_stage_latencies, latency_summary
+from medassist.rag import (NO_CONTEXT_RESPONSE, answer_from_sources, candidate_depth, retrieve_medical_sources_batch,
+                           select_context_sources)
+from medassist.vectorstore import build_medical_retriever
+
+
+def read_questions(path, id_field, question_field):
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if id_field not in record or question_field not in record:
+                raise ValueError(f"{path}:{line_number}: missing '{id_field}' or '{question_field}'")
+            yield str(record[id_field]), record[question_field]
+
+
+def answered_ids(path):
+    """IDs already answered without error in an existing output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; that question is simply redone
+                continue
+            if "error" not in record:
+                done.add(record["id"])
+    return done
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def answer_one(ai_client, question_id, question, candidates, model, max_tokens, retrieve_seconds=0.0):
+    """Answer one question from its retrieved candidates; ``retrieve_seconds`` is its share of the batch retrieval."""
+    timer = StageTimer(get_stage_latencies())
+    start = time.perf_counter()
+    sources = select_context_sources(question, candidates, model=model, timer=timer)
+    if sources:
+        with timer.stage("generate"):
+            answer = answer_from_sources(ai_client, question, sources, model=model, max_tokens=max_tokens)
+    else:
+        answer = NO_CONTEXT_RESPONSE
+    latency = retrieve_seconds + time.perf_counter() - start
+
+    record = {"id": question_id, "question": question, "answer": answer, "sources": sources, "latency_ms": round(latency * 1000, 1)}
+    if answer.startswith("❌"):
+        record["error"] = answer
+    return record, latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of questions")
+    parser.add_argument("output", help="JSONL file to append answers to")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--question-field", default="question")
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight")
+    parser.add_argument("--batch-size", type=int, default=64, help="questions per retrieval batch")
+    parser.add_argument("--use-openai-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    ai_client = MedicalAIClient(api_key, args.use_openai_embeddings)
+    if not ai_client.is_configured():
+        sys.exit("❌ OPENAI_API_KEY is not set")
+
+    retriever, stats = build_medical_retriever(args.use_openai_embeddings, api_key)
+    done = answered_ids(args.output)
+    pending = ((qid, q) for qid, q in read_questions(args.input, args.id_field, args.question_field) if qid not in done)
+    print(f"Knowledge base {stats['kb_version'][:12]} ready; skipping {len(done)} answered question(s)", file=sys.stderr)
+
+    latencies = []
+    answered = failed = 0
+    start = time.perf_counter()
+
+    with open(args.output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        def write_results(futures):
+            nonlocal answered, failed
+            for future in futures:
+                record, latency = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                latencies.append(latency)
+                if "error" in record:
+                    failed += 1
+                else:
+                    answered += 1
+
+        in_flight = set()
+        for batch in batched(pending, args.batch_size):
+            retrieve_start = time.perf_counter()
+            candidates_per_question = retrieve_medical_sources_batch(retriever, [q for _, q in batch], k=candidate_depth())
+            retrieve_seconds = time.perf_counter() - retrieve_start
+            get_stage_latencies().record("retrieve_batch", retrieve_seconds)
+            in_flight.update(
+                pool.submit(answer_one, ai_client, qid, q, candidates, args.model, args.max_tokens,
+                            retrieve_seconds / len(batch))
+                for (qid, q), candidates in zip(batch, candidates_per_question)
+            )
+
+            # Keep about one batch in flight: the pool stays busy while the next batch is retrieved
+            while len(in_flight) > args.batch_size:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                write_results(finished)
+
+            elapsed = time.perf_counter() - start
+            print(f"  {answered + failed} done ({failed} failed), {(answered + failed) / elapsed:.2f} q/s", file=sys.stderr)
+
+        write_results(wait(in_flight).done)
+
+    elapsed = time.perf_counter() - start
+    summary = latency_summary(latencies)
+    print(f"Answered {answered}, failed {failed} in {elapsed:.1f}s "
+          f"({(answered + failed) / elapsed if elapsed else 0:.2f} q/s)", file=sys.stderr)
+    if latencies:
+        print(f"Latency p50 {summary['p50_ms']:.0f} ms, p95 {summary['p95_ms']:.0f} ms", file=sys.stderr)
+        for stage, stage_summary in get_stage_latencies().summary().items():
+            print(f"  {stage:<15} p50 {stage_summary['p50_ms']:.1f} ms, p95 {stage_summary['p95_ms']:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark: recall, latency and memory of the configurable FAISS index types.
+
+Builds every index type from medassist.faiss_index over the same synthetic,
+clustered, L2-normalized embeddings (MiniLM-sized by default) and compares each
+against the exact flat index: recall@k of the true top-k, single-query latency
+(the app searches one question at a time), build/training time and serialized
+index size.
+
+Usage:
+    python -m benchmarks.bench_ann [--vectors 100000] [--dim 384] [--queries 500]
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from medassist.faiss_index import configure_search, create_index, effective_index_spec, factory_string, index_spec_from_env
+from medassist.metrics import latency_summary
+
+
+def synthetic_embeddings(n, dim, rng, clusters=1000, noise=1.0):
+    """Unit vectors drawn around random topic centroids, like chunk embeddings."""
+    centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centroids[rng.integers(0, clusters, n)] + noise * rng.standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def configurations(base, args):
+    return [
+        ("Flat", dict(base, type="flat")),
+        (f"IVF-Flat nprobe={args.nprobe // 2}", dict(base, type="ivf", nlist=args.nlist, nprobe=args.nprobe // 2)),
+        (f"IVF-Flat nprobe={args.nprobe}", dict(base, type="ivf", nlist=args.nlist, nprobe=args.nprobe)),
+        (f"IVF-PQ nprobe={args.nprobe}", dict(base, type="ivfpq", nlist=args.nlist, nprobe=args.nprobe, pq_m=args.pq_m)),
+        (f"HNSW efSearch={args.ef_search // 2}", dict(base, type="hnsw", ef_search=args.ef_search // 2)),
+        (f"HNSW efSearch={args.ef_search}", dict(base, type="hnsw", ef_search=args.ef_search)),
+    ]
+
+
+def recall_at_k(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = synthetic_embeddings(args.vectors + args.queries, args.dim, rng)
+    vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+    base = index_spec_from_env()
+
+    truth = None
+    print(f"{args.vectors:,} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k} vs Flat")
+    print(f"{'index':<22}{'factory':<16}{'build s':>9}{'MiB':>9}{'p50 ms':>9}{'p95 ms':>9}{'recall':>8}")
+    for name, spec in configurations(base, args):
+        spec = effective_index_spec(spec, len(vectors))
+        start = time.perf_counter()
+        index = create_index(vectors, spec)
+        index.add(vectors)
+        configure_search(index, spec)
+        build_seconds = time.perf_counter() - start
+        size_mib = len(faiss.serialize_index(index)) / 2**20
+
+        timings, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, ids = index.search(query[None, :], args.k)
+            timings.append(time.perf_counter() - start)
+            found.append(ids[0])
+        summary = latency_summary(timings)
+        if truth is None:
+            truth = found
+        print(f"{name:<22}{factory_string(spec):<16}{build_seconds:>9.1f}{size_mib:>9.1f}"
+              f"{summary['p50_ms']:>9.3f}{summary['p95_ms']:>9.3f}{recall_at_k(found, truth):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: BM25 lexical search latency on a large synthetic corpus.
+
+Builds a BM25Index over N synthetic ~800-character chunks whose vocabulary
+mixes the built-in corpus words with a long Zipf-distributed tail of rare terms
+(drug names, dosages), then times clinician-style queries. The lexical path of
+hybrid retrieval should stay under 2 ms per query at 100k chunks.
+
+Usage:
+    python -m benchmarks.bench_bm25 [--chunks 100000] [--queries 2000]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from medassist.bm25 import BM25Index, tokenize
+from medassist.knowledge import load_comprehensive_medical_knowledge
+from medassist.metrics import latency_summary
+
+TARGET_P95_MS = 2.0
+
+
+_SYLLABLES = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ru", "sa", "te", "vi", "xo", "zu"]
+
+
+def drug_name(i):
+    """Distinct alphabetic pseudo drug name such as "belanimab" (tokenizes as one word)."""
+    syllables = []
+    while True:
+        i, digit = divmod(i, len(_SYLLABLES))
+        syllables.append(_SYLLABLES[digit])
+        if i == 0:
+            break
+    return "".join(syllables) + "mab"
+
+
+def synthetic_corpus(n_chunks, rng, words_per_chunk=120, rare_terms=50_000):
+    base_vocab = sorted({token for doc in load_comprehensive_medical_knowledge() for token in tokenize(doc)})
+    rare_vocab = [drug_name(i) for i in range(rare_terms)] + [f"{i / 10:.1f}" for i in range(1000)]
+    vocab = base_vocab + rare_vocab
+
+    # Zipf-like weights: a few very common terms, a long tail of rare ones
+    weights = 1.0 / np.arange(1, len(vocab) + 1) ** 1.07
+    weights /= weights.sum()
+    order = rng.permutation(len(vocab))
+    draws = rng.choice(len(vocab), size=(n_chunks, words_per_chunk), p=weights)
+    texts = [" ".join(vocab[order[i]] for i in row) for row in draws]
+    return texts, [vocab[i] for i in order]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=20, help="candidates fetched per query (fetch_k)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    texts, vocab_by_frequency = synthetic_corpus(args.chunks, rng)
+
+    start = time.perf_counter()
+    index = BM25Index(texts)
+    build_seconds = time.perf_counter() - start
+
+    # Queries of 2-6 terms: mostly common words plus one rarer, specific term
+    query_rng = random.Random(0)
+    queries = []
+    for _ in range(args.queries):
+        common = query_rng.sample(vocab_by_frequency[:2000], query_rng.randint(1, 5))
+        specific = vocab_by_frequency[query_rng.randint(2000, len(vocab_by_frequency) - 1)]
+        queries.append(" ".join(common + [specific]))
+
+    for query in queries[:50]:  # warm-up
+        index.search(query, args.k)
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, args.k)
+        timings.append(time.perf_counter() - start)
+    summary = latency_summary(timings)
+
+    print(f"chunks            {args.chunks:,}")
+    print(f"vocabulary        {len(index.vocabulary):,} terms")
+    print(f"postings memory   {index.memory_bytes() / 2**20:.1f} MiB")
+    print(f"build time        {build_seconds:.1f} s")
+    print(f"query p50         {summary['p50_ms']:.3f} ms")
+    print(f"query p95         {summary['p95_ms']:.3f} ms")
+    print(f"query p99         {summary['p99_ms']:.3f} ms")
+    verdict = "PASS" if summary["p95_ms"] < TARGET_P95_MS else "FAIL"
+    print(f"target p95 < {TARGET_P95_MS} ms: {verdict}")
+
+
+if __name__ == "__main__":
+    main()
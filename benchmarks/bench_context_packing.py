@@ -0,0 +1,98 @@
+"""Micro-benchmark: per-query context truncation cost, before and after.
+
+"before" is the original loop from generate_medical_rag_response, which called
+tiktoken.get_encoding() and re-encoded every sentence separately. "after" is
+medassist.tokens.pack_context, which encodes the context once with a memoized
+encoder and cuts at a sentence-aligned token offset.
+
+Usage:
+    python -m benchmarks.bench_context_packing [--queries 200] [--budget 2000]
+"""
+import argparse
+import random
+import statistics
+import time
+
+import tiktoken
+
+from medassist.tokens import count_tokens, get_encoding, pack_context
+
+SENTENCES = [
+    "Metformin is first-line therapy for type 2 diabetes unless contraindicated",
+    "Contraindications include severe kidney disease (eGFR <30) and conditions predisposing to lactic acidosis",
+    "STEMI requires primary PCI within 90 minutes or fibrinolytic therapy within 30 minutes if PCI is unavailable",
+    "Anaphylaxis requires immediate epinephrine 0.3-0.5 mg IM in the anterolateral thigh",
+    "Benzodiazepines (lorazepam, alprazolam) provide rapid relief but have addiction potential",
+    "Target INR is 2-3 for most indications and 2.5-3.5 for mechanical heart valves",
+    "CURB-65 score helps determine pneumonia severity and treatment setting",
+    "Peak flow <50% of personal best indicates a severe asthma exacerbation",
+]
+
+
+def legacy_truncate(context, max_context_tokens):
+    """The pre-optimization implementation, kept verbatim for comparison."""
+    def count_tokens_legacy(text):
+        enc = tiktoken.get_encoding("cl100k_base")
+        return len(enc.encode(text))
+
+    if count_tokens_legacy(context) > max_context_tokens:
+        sentences = context.split('. ')
+        truncated_context = ""
+        current_tokens = 0
+        for sentence in sentences:
+            sentence_tokens = count_tokens_legacy(sentence + '. ')
+            if current_tokens + sentence_tokens <= max_context_tokens:
+                truncated_context += sentence + '. '
+                current_tokens += sentence_tokens
+            else:
+                break
+        context = truncated_context
+    return context
+
+
+def make_context(n_chunks, rng):
+    """Roughly 800-character chunks joined the way the RAG prompt joins them."""
+    chunks = []
+    for _ in range(n_chunks):
+        chunk = ""
+        while len(chunk) < 800:
+            chunk += rng.choice(SENTENCES) + ". "
+        chunks.append(chunk.strip())
+    return "\n\n---\n\n".join(chunks)
+
+
+def time_per_query(fn, contexts, budget):
+    timings = []
+    for context in contexts:
+        start = time.perf_counter()
+        fn(context, budget)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[4, 12, 25])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    get_encoding()  # Load the BPE table outside the timed region for both variants
+
+    print(f"{'chunks':>6} {'tokens':>7} {'before p50 ms':>14} {'after p50 ms':>13} {'speedup':>8} {'kept before/after':>18}")
+    for n_chunks in args.chunks:
+        contexts = [make_context(n_chunks, rng) for _ in range(args.queries)]
+        before = time_per_query(legacy_truncate, contexts, args.budget)
+        after = time_per_query(pack_context, contexts, args.budget)
+
+        before_p50 = statistics.median(before) * 1000
+        after_p50 = statistics.median(after) * 1000
+        kept_before = count_tokens(legacy_truncate(contexts[0], args.budget))
+        kept_after = count_tokens(pack_context(contexts[0], args.budget))
+        print(f"{n_chunks:>6} {count_tokens(contexts[0]):>7} {before_p50:>14.3f} {after_p50:>13.3f} "
+              f"{before_p50 / after_p50:>7.1f}x {kept_before:>8}/{kept_after:<8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Benchmark: offline end-to-end performance of the RAG pipeline.
+
+Starts the local OpenAI stand-in (benchmarks.mock_openai), points the client at
+it through OPENAI_BASE_URL and measures, in a fresh cache directory:
+
+  cold_start      build_medical_retriever with empty caches, then again warm
+  retrieval       hybrid retrieval latency per question
+  token_counting  count_tokens and pack_context cost on real prompts
+  end_to_end      QPS and p50/p95/p99 for N concurrent simulated users, each
+                  asking questions back to back (response and answer caches off)
+  stages          per-stage p50/p95 collected by the pipeline itself
+
+Results are written as JSON (with git commit and settings) for tracking
+regressions; ``--baseline`` prints the change against an earlier results file.
+
+Usage:
+    python -m benchmarks.bench_e2e --users 8 --requests 20 --output e2e.json
+    python -m benchmarks.bench_e2e --stream --rate-limit 0.05 --baseline e2e.json
+    python -m benchmarks.bench_e2e --openai-embeddings    # embed through the mock too
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.mock_openai import MockOpenAIServer
+from medassist.client import MedicalAIClient
+from medassist.metrics import get_stage_latencies, latency_summary
+from medassist.rag import (MAX_CONTEXT_TOKENS, build_medical_rag_prompt, generate_medical_rag_response,
+                           retrieve_medical_sources, stream_medical_rag_response)
+from medassist.tokens import count_tokens, pack_context
+from medassist.vectorstore import build_medical_retriever
+
+QUESTIONS = [
+    "What is the first-line treatment for status epilepticus?",
+    "How is anaphylaxis managed in the emergency department?",
+    "What are the diagnostic criteria for type 2 diabetes?",
+    "Which antihypertensives are preferred in chronic kidney disease?",
+    "How should community-acquired pneumonia be treated in adults?",
+    "What are the warning signs of sepsis?",
+    "How is atrial fibrillation rate controlled?",
+    "What monitoring is needed for patients on warfarin?",
+    "How is an acute asthma exacerbation treated?",
+    "What are the symptoms of a myocardial infarction?",
+    "What is the dose of epinephrine for anaphylaxis?",
+    "How is major depressive disorder treated?",
+    "What lifestyle changes help manage hypertension?",
+    "When should antibiotics be given for a urinary tract infection?",
+    "How is diabetic ketoacidosis managed?",
+    "What are contraindications to thrombolysis in stroke?",
+]
+
+# (section, metric, higher is better) compared against --baseline
+TRACKED_METRICS = [
+    ("cold_start", "cold_seconds", False),
+    ("cold_start", "warm_seconds", False),
+    ("retrieval", "p95_ms", False),
+    ("token_counting", "count_tokens_p95_ms", False),
+    ("end_to_end", "qps", True),
+    ("end_to_end", "p99_ms", False),
+]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_cold_start(use_openai_embeddings, api_key):
+    start = time.perf_counter()
+    build_medical_retriever(use_openai_embeddings, api_key)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    retriever, stats = build_medical_retriever(use_openai_embeddings, api_key)
+    warm = time.perf_counter() - start
+    return retriever, {"cold_seconds": cold, "warm_seconds": warm, "total_chunks": stats["total_chunks"]}
+
+
+def measure_retrieval(retriever, rounds):
+    timings = []
+    for _ in range(rounds):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            retrieve_medical_sources(retriever, question)
+            timings.append(time.perf_counter() - start)
+    return latency_summary(timings)
+
+
+def measure_token_counting(retriever, model):
+    prompts = [build_medical_rag_prompt(q, retrieve_medical_sources(retriever, q), model=model) for q in QUESTIONS]
+    count_timings, pack_timings = [], []
+    for _ in range(20):
+        for prompt in prompts:
+            start = time.perf_counter()
+            count_tokens(prompt, model=model)
+            count_timings.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            pack_context(prompt, MAX_CONTEXT_TOKENS // 2, model=model)
+            pack_timings.append(time.perf_counter() - start)
+
+    count_summary, pack_summary = latency_summary(count_timings), latency_summary(pack_timings)
+    return {
+        "count_tokens_p50_ms": count_summary["p50_ms"],
+        "count_tokens_p95_ms": count_summary["p95_ms"],
+        "pack_context_p50_ms": pack_summary["p50_ms"],
+        "pack_context_p95_ms": pack_summary["p95_ms"],
+    }
+
+
+def simulated_user(ai_client, retriever, user_id, requests, model, stream):
+    latencies, first_tokens, errors = [], [], 0
+    for i in range(requests):
+        question = QUESTIONS[(user_id + i) % len(QUESTIONS)]
+        start = time.perf_counter()
+        if stream:
+            _, deltas = stream_medical_rag_response(ai_client, retriever, question, model=model)
+            parts = []
+            for delta in deltas:
+                if not parts:
+                    first_tokens.append(time.perf_counter() - start)
+                parts.append(delta)
+            answer = "".join(parts)
+        else:
+            answer, _ = generate_medical_rag_response(ai_client, retriever, question, model=model)
+        latencies.append(time.perf_counter() - start)
+        errors += "❌" in answer
+    return latencies, first_tokens, errors
+
+
+def measure_end_to_end(retriever, api_key, users, requests, model, stream):
+    # Every request must reach the (mock) API, so the on-disk response cache is off
+    ai_client = MedicalAIClient(api_key, use_response_cache=False)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        futures = [pool.submit(simulated_user, ai_client, retriever, u, requests, model, stream) for u in range(users)]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    latencies = [t for user_latencies, _, _ in results for t in user_latencies]
+    first_tokens = [t for _, user_first_tokens, _ in results for t in user_first_tokens]
+    summary = latency_summary(latencies)
+    summary.update({
+        "users": users,
+        "requests": len(latencies),
+        "errors": sum(errors for _, _, errors in results),
+        "seconds": elapsed,
+        "qps": len(latencies) / elapsed if elapsed else 0.0,
+    })
+    if first_tokens:
+        summary["first_token_p50_ms"] = latency_summary(first_tokens)["p50_ms"]
+        summary["first_token_p95_ms"] = latency_summary(first_tokens)["p95_ms"]
+    return summary
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nChange vs {baseline_path} ({(baseline.get('git_commit') or 'unknown')[:10]}):")
+    for section, metric, higher_is_better in TRACKED_METRICS:
+        old = baseline.get(section, {}).get(metric)
+        new = results.get(section, {}).get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regressed = change < -0.1 if higher_is_better else change > 0.1
+        print(f"  {section + '.' + metric:<36}{old:>10.2f} -> {new:>10.2f}  {change:+.0%}{'  REGRESSION' if regressed else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=20, help="questions per user")
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--stream", action="store_true", help="use the streaming pipeline")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="mock seconds per streamed token")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of mock chat requests answered 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--openai-embeddings", action="store_true", help="embed through the mock instead of locally")
+    parser.add_argument("--cache-dir", help="cache directory (default: a fresh temporary one, so the start is cold)")
+    parser.add_argument("--output", default="bench_e2e_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=args.latency, token_delay=args.token_delay,
+                              rate_limit=args.rate_limit, retry_after=args.retry_after).start()
+    # Set before the first client and the process-wide caches are created
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["MEDASSIST_CACHE_DIR"] = args.cache_dir or tempfile.mkdtemp(prefix="medassist-bench-")
+    api_key = "sk-mock-benchmark"
+
+    try:
+        print(f"Mock OpenAI API on {server.base_url}; cache in {os.environ['MEDASSIST_CACHE_DIR']}", file=sys.stderr)
+        retriever, cold_start = measure_cold_start(args.openai_embeddings, api_key)
+        print(f"  cold start {cold_start['cold_seconds']:.2f}s, warm {cold_start['warm_seconds']:.2f}s", file=sys.stderr)
+        retrieval = measure_retrieval(retriever, rounds=5)
+        token_counting = measure_token_counting(retriever, args.model)
+        end_to_end = measure_end_to_end(retriever, api_key, args.users, args.requests, args.model, args.stream)
+    finally:
+        server.stop()
+
+    results = {
+        "benchmark": "e2e",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": vars(args),
+        "cold_start": cold_start,
+        "retrieval": retrieval,
+        "token_counting": token_counting,
+        "end_to_end": end_to_end,
+        "stages": get_stage_latencies().summary(),
+        "mock_requests": dict(server.counters),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"retrieval         p50 {retrieval['p50_ms']:.2f} ms, p95 {retrieval['p95_ms']:.2f} ms")
+    print(f"count_tokens      p50 {token_counting['count_tokens_p50_ms']:.3f} ms, "
+          f"pack_context p50 {token_counting['pack_context_p50_ms']:.3f} ms")
+    print(f"end to end        {end_to_end['qps']:.1f} q/s with {args.users} users, "
+          f"p50 {end_to_end['p50_ms']:.0f} ms, p99 {end_to_end['p99_ms']:.0f} ms, {end_to_end['errors']} errors")
+    print(f"mock API          {server.counters['chat']} chat calls, {server.counters['rate_limited']} rate limited")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark: import cost of the Streamlit app and time to first paint.
+
+Streamlit paints ``app.py`` as the script runs, so nothing is shown until its
+top-level imports finish. This runs exactly those imports (read from app.py)
+in fresh interpreters with ``-X importtime``, after importing streamlit itself
+as ``streamlit run`` already has, and reports:
+
+  first paint     wall time of app.py's imports (median over --runs)
+  by package      self time summed per top-level package (from -X importtime)
+  slowest         modules with the largest cumulative import time
+  deferred        cost of the knowledge-base stack loaded on first use
+
+It fails when the first paint exceeds the target or pulls in any of the
+packages in ``DEFERRED_PACKAGES``, which must only load on first use.
+
+Usage:
+    python -m benchmarks.bench_importtime [--runs 5] [--top 15]
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+TARGET_FIRST_PAINT_MS = 400.0
+
+# Packages the app's first paint must not import (loaded lazily on first use)
+DEFERRED_PACKAGES = ("numpy", "tiktoken")
+
+# Separates streamlit's own imports from the app's in the -X importtime report
+_MARKER = "--- app imports ---"
+
+_PROBE = """
+import sys, time
+import streamlit
+sys.stderr.write({marker!r} + "\\n")
+start = time.perf_counter()
+{imports}
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def app_imports(path=APP_PATH):
+    """Source of the module-level import statements of ``app.py``."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in nodes)
+
+
+def profile_imports(imports):
+    """(milliseconds, [(self_us, cumulative_us, module)]) for one fresh interpreter."""
+    probe = _PROBE.format(marker=_MARKER, imports=imports)
+    root = os.path.dirname(APP_PATH)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=root,
+                            capture_output=True, text=True, check=True)
+
+    report = result.stderr.split(_MARKER, 1)[-1]
+    modules = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+    return float(result.stdout.strip().splitlines()[-1]), modules
+
+
+def by_package(modules):
+    totals = defaultdict(int)
+    for self_us, _, name in modules:
+        totals[name.split(".")[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="packages and modules to list")
+    args = parser.parse_args()
+
+    imports = app_imports()
+    runs = [profile_imports(imports) for _ in range(args.runs)]
+    first_paint = statistics.median(ms for ms, _ in runs)
+    modules = runs[-1][1]
+
+    print(f"app.py imports ({len(modules)} modules, streamlit preloaded): "
+          f"median {first_paint:.0f} ms over {args.runs} runs")
+    print(f"\n{'package':<40}{'self ms':>10}")
+    for package, self_us in by_package(modules)[:args.top]:
+        print(f"{package:<40}{self_us / 1000:>10.1f}")
+
+    print(f"\n{'module':<40}{'cumulative ms':>14}")
+    for _, cumulative_us, name in sorted(modules, key=lambda module: module[1], reverse=True)[:args.top]:
+        print(f"{name:<40}{cumulative_us / 1000:>14.1f}")
+
+    # What the first knowledge-base load pays on top of the first paint
+    deferred = statistics.median(
+        profile_imports(imports + "\nfrom medassist.vectorstore import build_medical_retriever")[0]
+        for _ in range(args.runs)
+    ) - first_paint
+    print(f"\ndeferred to first use (medassist.vectorstore): {deferred:.0f} ms")
+
+    eager = sorted({name.split(".")[0] for _, _, name in modules} & set(DEFERRED_PACKAGES))
+    print(f"deferred packages imported by the first paint: {', '.join(eager) or 'none'}")
+
+    verdict = "PASS" if first_paint < TARGET_FIRST_PAINT_MS and not eager else "FAIL"
+    print(f"target time to first paint < {TARGET_FIRST_PAINT_MS:.0f} ms without {', '.join(DEFERRED_PACKAGES)}: {verdict}")
+
+
+if __name__ == "__main__":
+    main()
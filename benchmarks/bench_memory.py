@@ -0,0 +1,125 @@
+"""Benchmark: resident memory of a served knowledge base with a large corpus.
+
+Writes a synthetic corpus of N topics in the medassist.knowledge JSONL format
+and builds its index once, embedding through the local OpenAI stand-in
+(benchmarks.mock_openai). A fresh process then loads the index the way the app
+does and runs retrieval queries, reporting its private (anonymous) and
+file-backed resident memory:
+
+  loaded    after build_medical_retriever loaded the cached index
+  served    after the retrieval queries
+  decoded   after decoding every chunk into a dict, i.e. holding the corpus in
+            process memory like LangChain's InMemoryDocstore (for comparison)
+
+Chunk text is memory-mapped and only the top-k hits are decoded, so serving
+should add under a quarter of the private memory that holding every chunk costs.
+
+Usage:
+    python -m benchmarks.bench_memory [--topics 20000] [--queries 200]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.bench_bm25 import synthetic_corpus
+from benchmarks.mock_openai import MockOpenAIServer
+
+# Private memory added by serving, relative to holding every chunk in memory
+TARGET_GROWTH_RATIO = 0.25
+
+SPECIALTIES = ["cardiology", "endocrinology", "pulmonology", "infectious_disease", "emergency_medicine",
+               "gastroenterology", "pharmacology", "psychiatry"]
+
+
+def resident_mb():
+    """(anonymous, file-backed) resident memory of this process in MB, from /proc."""
+    values = {}
+    with open("/proc/self/status", "r", encoding="utf-8") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("RssAnon", "RssFile"):
+                values[key] = int(value.split()[0]) / 1024
+    return values.get("RssAnon", 0.0), values.get("RssFile", 0.0)
+
+
+def write_corpus(path, n_topics, seed=0):
+    texts, _ = synthetic_corpus(n_topics, np.random.default_rng(seed))
+    with open(path, "w", encoding="utf-8") as f:
+        for i, text in enumerate(texts):
+            record = {"source": f"topic_{i}", "specialty": SPECIALTIES[i % len(SPECIALTIES)], "version": 1, "text": text}
+            f.write(json.dumps(record) + "\n")
+
+
+def measure(queries):
+    """Child process: load the cached index and report memory after each phase, as JSON."""
+    from medassist.vectorstore import OPENAI_EMBEDDING_MODEL, build_medical_retriever, create_embedding_model
+
+    # Libraries and the query embedder are loaded first: they cost the same for any corpus
+    create_embedding_model(OPENAI_EMBEDDING_MODEL, os.environ["OPENAI_API_KEY"])
+    phases = {"start": resident_mb()}
+    retriever, stats = build_medical_retriever(True, os.environ["OPENAI_API_KEY"])
+    phases["loaded"] = resident_mb()
+
+    rng = random.Random(1)
+    for _ in range(queries):
+        retriever.search_with_scores(" ".join(rng.choice(SPECIALTIES) for _ in range(4)))
+    phases["served"] = resident_mb()
+
+    docstore = retriever.vectorstore.docstore
+    decoded = {position: docstore.search(str(position)) for position in range(retriever.vectorstore.index.ntotal)}
+    phases["decoded"] = resident_mb()
+    print(json.dumps({"phases": phases, "chunks": stats["total_chunks"], "decoded": len(decoded)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.queries)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="medassist-bench-memory-")
+    corpus_path = os.path.join(workdir, "corpus.jsonl")
+    write_corpus(corpus_path, args.topics)
+    corpus_mb = os.path.getsize(corpus_path) / 1e6
+
+    server = MockOpenAIServer(latency=0.0, embedding_dim=384).start()
+    env = dict(os.environ, MEDASSIST_CORPUS_PATH=corpus_path, MEDASSIST_CACHE_DIR=os.path.join(workdir, "cache"),
+               OPENAI_BASE_URL=server.base_url, OPENAI_API_KEY="sk-mock-benchmark")
+    command = [sys.executable, "-m", "benchmarks.bench_memory", "--measure", "--queries", str(args.queries)]
+    try:
+        # The first run builds and caches the index; the second measures a warm load as the app serves it
+        subprocess.run(command, env=env, check=True, capture_output=True)
+        result = json.loads(subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout)
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    phases = result["phases"]
+    start_anon = phases["start"][0]
+    print(f"corpus: {args.topics:,} topics, {result['chunks']:,} chunks, {corpus_mb:.1f} MB of JSONL")
+    print(f"{'phase':<10}{'anon MB':>10}{'file MB':>10}{'anon growth':>14}")
+    for phase in ("start", "loaded", "served", "decoded"):
+        anon, file_backed = phases[phase]
+        print(f"{phase:<10}{anon:>10.1f}{file_backed:>10.1f}{anon - start_anon:>14.1f}")
+
+    growth = phases["served"][0] - start_anon
+    in_memory = phases["decoded"][0] - start_anon
+    ok = growth < TARGET_GROWTH_RATIO * in_memory
+    print(f"\ntarget serving growth < {TARGET_GROWTH_RATIO:.0%} of an in-memory docstore's "
+          f"({growth:.1f} MB vs {in_memory:.1f} MB): {'PASS' if ok else 'FAIL'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark: specialty-filtered search through per-specialty sub-indexes.
+
+Tags synthetic clustered embeddings (benchmarks.bench_ann) with one of N
+specialties and compares, for queries filtered to one specialty:
+
+  post-filter   search the global index for k * oversample hits, keep the
+                filtered ones (what a plain metadata filter does)
+  partitioned   search only the specialty's sub-index (medassist.partitions)
+
+against the exact filtered top-k: recall@k, how often fewer than k hits come
+back, and single-query latency. Skewed specialty sizes make the rare ones the
+hard case for post-filtering. Both use the same index spec
+(MEDASSIST_INDEX_TYPE etc.). Partitioned search should always return k hits
+from the selected specialty, with at least post-filtering's recall.
+
+Usage:
+    python -m benchmarks.bench_partitions [--vectors 200000] [--specialties 8] [--oversample 4]
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.bench_ann import recall_at_k, synthetic_embeddings
+from medassist.faiss_index import create_index, effective_index_spec, index_spec_from_env
+from medassist.metrics import latency_summary
+from medassist.partitions import PartitionedIndex
+
+
+def timed_search(search, queries):
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query[None, :]))
+        timings.append(time.perf_counter() - start)
+    return results, latency_summary(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--specialties", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--oversample", type=int, default=4, help="global hits fetched per wanted hit when post-filtering")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = synthetic_embeddings(args.vectors + args.queries, args.dim, rng)
+    vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+
+    # Zipf-like specialty sizes: the last specialty holds a small share of the corpus
+    weights = 1.0 / np.arange(1, args.specialties + 1)
+    tags = rng.choice(args.specialties, size=args.vectors, p=weights / weights.sum())
+    positions = {f"specialty_{s}": np.flatnonzero(tags == s) for s in range(args.specialties)}
+
+    spec = effective_index_spec(index_spec_from_env(), args.vectors)
+    start = time.perf_counter()
+    index = create_index(vectors, spec)
+    index.add(vectors)
+    global_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    partitions = PartitionedIndex.build(index, positions, spec)
+    partition_seconds = time.perf_counter() - start
+    print(f"{args.vectors:,} vectors x {args.dim} dims, {spec['type']} index, {args.queries} queries, k={args.k}")
+    print(f"build: global {global_seconds:.1f} s, partitions {partition_seconds:.1f} s\n")
+
+    ok = True
+    print(f"{'specialty':<14}{'share':>7}{'method':>13}{'p50 ms':>9}{'p95 ms':>9}{'recall':>8}{'short':>7}")
+    for value in (min(positions, key=lambda v: len(positions[v])), max(positions, key=lambda v: len(positions[v]))):
+        allowed = positions[value]
+        exact = faiss.IndexFlatL2(args.dim)
+        exact.add(vectors[allowed])
+        _, truth = exact.search(queries, args.k)
+        truth = allowed[truth]
+        in_value = np.zeros(args.vectors, dtype=bool)
+        in_value[allowed] = True
+
+        def post_filter(query):
+            _, found = index.search(query, args.k * args.oversample)
+            return [p for p in found[0] if p >= 0 and in_value[p]][:args.k]
+
+        def partitioned(query):
+            _, found = partitions.search(query, args.k, [value])
+            return [p for p in found[0] if p >= 0]
+
+        share = len(allowed) / args.vectors
+        recall = {}
+        for method, search in (("post-filter", post_filter), ("partitioned", partitioned)):
+            found, latency = timed_search(search, queries)
+            short = np.mean([len(f) < args.k for f in found])
+            recall[method] = recall_at_k(found, truth)
+            print(f"{value:<14}{share:>7.1%}{method:>13}{latency['p50_ms']:>9.2f}{latency['p95_ms']:>9.2f}"
+                  f"{recall[method]:>8.3f}{short:>7.1%}")
+            if method == "partitioned":
+                ok = ok and short == 0 and recall["partitioned"] >= recall["post-filter"]
+
+    print(f"\ntarget partitioned: no short results, recall@{args.k} >= post-filter's: {'PASS' if ok else 'FAIL'}")
+
+
+if __name__ == "__main__":
+    main()
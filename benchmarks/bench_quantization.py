@@ -0,0 +1,90 @@
+"""Benchmark: memory and recall of float16 / int8 vector storage.
+
+For each index type, builds float32, float16 and int8 (scalar-quantized)
+variants over the same synthetic embeddings, plus int8 with exact float32
+re-scoring. Reports resident code size per vector and in total, the float32
+copy kept only for re-scoring (memory-mapped, so it stays on disk), single-query
+latency and recall@k against exact float32 search.
+
+Usage:
+    python -m benchmarks.bench_quantization [--vectors 100000] [--dim 384] [--types flat,hnsw]
+    python -m benchmarks.bench_quantization --dim 1536            # ada-002 sized
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.bench_ann import recall_at_k, synthetic_embeddings
+from medassist.faiss_index import configure_search, create_index, effective_index_spec, factory_string, index_spec_from_env
+from medassist.metrics import latency_summary
+
+
+def configurations(base, index_types, rescore_factor):
+    configs = []
+    for index_type in index_types:
+        if index_type == "ivfpq":
+            configs.append(dict(base, type="ivfpq", rescore_factor=0))
+            configs.append(dict(base, type="ivfpq", rescore_factor=rescore_factor))
+            continue
+        for storage in ("float32", "float16", "int8"):
+            configs.append(dict(base, type=index_type, storage=storage, rescore_factor=0))
+        configs.append(dict(base, type=index_type, storage="int8", rescore_factor=rescore_factor))
+    return configs
+
+
+def index_sizes(index):
+    """(bytes searched in memory, bytes of float32 vectors kept only for re-scoring)."""
+    if isinstance(index, faiss.IndexRefine):
+        base = faiss.downcast_index(index.base_index)
+        refine = faiss.downcast_index(index.refine_index)
+        return len(faiss.serialize_index(base)), len(faiss.serialize_index(refine))
+    return len(faiss.serialize_index(index)), 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--types", default="flat", help="comma-separated index types (flat, ivf, ivfpq, hnsw)")
+    parser.add_argument("--rescore-factor", type=float, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = synthetic_embeddings(args.vectors + args.queries, args.dim, rng)
+    vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+    base = dict(index_spec_from_env(), pq_m=args.dim // 8)
+
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+    float32_bytes = vectors.nbytes
+
+    print(f"{args.vectors:,} vectors x {args.dim} dims ({float32_bytes / 2**20:.1f} MiB as float32), "
+          f"recall@{args.k} vs exact float32")
+    print(f"{'factory':<30}{'B/vec':>7}{'MiB':>9}{'saved':>8}{'rescore MiB':>13}{'p50 ms':>9}{'p95 ms':>9}{'recall':>8}")
+    for spec in configurations(base, args.types.split(","), args.rescore_factor):
+        spec = effective_index_spec(spec, len(vectors))
+        index = create_index(vectors, spec)
+        index.add(vectors)
+        configure_search(index, spec)
+        resident, rescore_bytes = index_sizes(index)
+
+        timings, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, ids = index.search(query[None, :], args.k)
+            timings.append(time.perf_counter() - start)
+            found.append(ids[0])
+        summary = latency_summary(timings)
+
+        print(f"{factory_string(spec):<30}{resident / args.vectors:>7.0f}{resident / 2**20:>9.1f}"
+              f"{max(0.0, 1 - resident / float32_bytes):>8.0%}{rescore_bytes / 2**20:>13.1f}"
+              f"{summary['p50_ms']:>9.3f}{summary['p95_ms']:>9.3f}{recall_at_k(found, truth):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
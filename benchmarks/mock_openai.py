@@ -0,0 +1,175 @@
+"""Local OpenAI-compatible stand-in for offline benchmarks and load tests.
+
+Serves ``POST /v1/chat/completions`` (plain and ``stream: true`` server-sent
+events) and ``POST /v1/embeddings`` with deterministic hashed vectors. Latency,
+streaming speed and rate limiting are configurable, so the whole pipeline can be
+exercised without network access or API spend:
+
+    python -m benchmarks.mock_openai --port 8001 --latency 0.3 --rate-limit 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=sk-mock streamlit run app.py
+
+Benchmarks start it in-process with ``MockOpenAIServer(...).start()``.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ANSWER_WORDS = (
+    "## Assessment The presentation is consistent with the condition described in the provided context . "
+    "## Treatment First-line management follows current guidelines with dose adjustment for renal function , "
+    "monitoring of vital signs and follow-up within two weeks . Consult the treating physician ."
+).split()
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        if self.path.endswith("/embeddings"):
+            server.count("embeddings")
+            inputs = body.get("input", [])
+            if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                inputs = [inputs]
+            as_base64 = body.get("encoding_format") == "base64"
+            data = [
+                {"object": "embedding", "index": i, "embedding": server.embed(text, as_base64)}
+                for i, text in enumerate(inputs)
+            ]
+            self._send_json(200, {"object": "list", "data": data, "model": body.get("model"),
+                                  "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+            return
+
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        server.count("chat")
+        if server.should_rate_limit():
+            server.count("rate_limited")
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit"}},
+                            headers={"Retry-After": str(server.retry_after)})
+            return
+
+        time.sleep(server.latency)
+        words = ANSWER_WORDS[:min(len(ANSWER_WORDS), body.get("max_tokens", len(ANSWER_WORDS)))]
+
+        if not body.get("stream"):
+            time.sleep(server.token_delay * len(words))
+            self._send_json(200, {
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+                "usage": {"completion_tokens": len(words)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        # No Content-Length for an event stream: close the connection to end it
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i, word in enumerate(words):
+            chunk = {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": (" " if i else "") + word}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(server.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """Threaded mock server; ``base_url`` is what OPENAI_BASE_URL should be set to."""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, token_delay=0.005, rate_limit=0.0,
+                 retry_after=1, embedding_dim=1536, seed=0):
+        super().__init__((host, port), MockOpenAIHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.embedding_dim = embedding_dim
+        self.counters = {"chat": 0, "embeddings": 0, "rate_limited": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def should_rate_limit(self):
+        with self._lock:
+            return self._random.random() < self.rate_limit
+
+    def embed(self, text, as_base64=False):
+        """Deterministic unit vector from the words of ``text`` (token IDs are hashed as-is)."""
+        words = text.lower().split() if isinstance(text, str) else [str(token) for token in text]
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        for word in words:
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.embedding_dim] += 1.0
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        if as_base64:
+            return base64.b64encode(vector.tobytes()).decode("ascii")
+        return vector.tolist()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds per streamed token")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of chat requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.host, args.port, args.latency, args.token_delay, args.rate_limit, args.retry_after)
+    print(f"Mock OpenAI API on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Backend building blocks for the MedAssist AI medical RAG app."""
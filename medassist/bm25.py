@@ -0,0 +1,205 @@
+"""In-process BM25 lexical index over the knowledge-base chunks.
+
+Dense embeddings blur exact drug names and dosages ("lorazepam", "0.3-0.5 mg")
+that clinicians type verbatim; BM25 matches them exactly. Postings are stored
+in compressed-sparse-row form (one int32 doc-id array and one float32 weight
+array, sliced per term) with the BM25 term weight precomputed per posting.
+Queries use MaxScore-style pruning so common terms are only looked up for the
+candidates a selective term already produced.
+"""
+import json
+import os
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+
+# Numbers (including decimals such as 0.3) and words; "0.5mg" -> "0.5", "mg"
+_TOKEN = re.compile(r"\d+(?:\.\d+)?|[^\W\d_]+")
+
+# Arrays persisted by save() / load()
+_ARRAYS = ("offsets", "doc_ids", "weights", "max_weights")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in include includes is it its "
+    "of on or that the their this to was were which with".split()
+)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class _StoreTexts:
+    """Chunk texts of a FAISS store in position order, decoded as they are iterated."""
+
+    def __init__(self, vectorstore):
+        self.vectorstore = vectorstore
+
+    def __len__(self):
+        return self.vectorstore.index.ntotal
+
+    def __iter__(self):
+        docstore, ids = self.vectorstore.docstore, self.vectorstore.index_to_docstore_id
+        for position in range(len(self)):
+            yield docstore.search(ids[position]).page_content
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of texts; document IDs are list positions."""
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+
+        term_ids = array("i")
+        doc_ids = array("i")
+        term_freqs = array("f")
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                doc_ids.append(doc_id)
+                term_freqs.append(tf)
+
+        self.num_docs = len(texts)
+        term_ids = np.frombuffer(term_ids, dtype=np.int32)
+        doc_ids = np.frombuffer(doc_ids, dtype=np.int32)
+        term_freqs = np.frombuffer(term_freqs, dtype=np.float32)
+
+        # Group postings by term (stable keeps each list sorted by doc id)
+        order = np.argsort(term_ids, kind="stable")
+        self._doc_ids = doc_ids[order]
+        term_freqs = term_freqs[order]
+        doc_freqs = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self._offsets = np.concatenate(([0], np.cumsum(doc_freqs))).astype(np.int64)
+
+        # Precompute idf * saturated tf for every posting
+        avg_length = float(doc_lengths.mean()) if self.num_docs else 0.0
+        norm = k1 * (1 - b + b * doc_lengths[self._doc_ids] / (avg_length or 1.0))
+        idf = np.log1p((self.num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        posting_idf = np.repeat(idf, doc_freqs)
+        self._weights = (posting_idf * term_freqs * (k1 + 1) / (term_freqs + norm)).astype(np.float32)
+
+        # Per-term upper bound on any single document's contribution
+        if len(self.vocabulary):
+            self._max_weights = np.maximum.reduceat(self._weights, self._offsets[:-1])
+        else:
+            self._max_weights = np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs):
+        """Index a FAISS store's chunks so BM25 doc IDs equal FAISS positions; texts are read one at a time."""
+        return cls(_StoreTexts(vectorstore), **kwargs)
+
+    def save(self, directory):
+        """Write the index as a vocabulary JSON file plus one ``.npy`` file per array."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "vocabulary.json"), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "num_docs": self.num_docs, "vocabulary": self.vocabulary}, f)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, f"_{name}"))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved index; with ``mmap`` the postings stay in the shared page cache."""
+        index = cls.__new__(cls)
+        with open(os.path.join(directory, "vocabulary.json"), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        index.k1, index.b, index.num_docs = header["k1"], header["b"], header["num_docs"]
+        index.vocabulary = header["vocabulary"]
+        for name in _ARRAYS:
+            values = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            # A plain ndarray view avoids np.memmap's per-operation overhead
+            setattr(index, f"_{name}", values.view(np.ndarray))
+        return index
+
+    def _postings(self, term_id):
+        start, end = self._offsets[term_id], self._offsets[term_id + 1]
+        return self._doc_ids[start:end], self._weights[start:end]
+
+    def _add_postings(self, candidates, scores, term_ids):
+        for term_id in term_ids:
+            doc_ids, weights = self._postings(term_id)
+            # Posting lists are sorted by doc id, so membership is a binary search
+            positions = np.minimum(np.searchsorted(doc_ids, candidates), len(doc_ids) - 1)
+            hits = doc_ids[positions] == candidates
+            scores[hits] += weights[positions[hits]]
+        return scores
+
+    def search(self, query, k, allowed=None):
+        """Exact top-k ``(doc_id, score)`` pairs for the query, best first.
+
+        MaxScore-style pruning: terms are accumulated rarest first, and once the
+        k-th best score among documents seen so far beats the summed upper
+        bounds of the remaining (common) terms, no unseen document can enter the
+        top k, so those terms are only looked up for the current candidates.
+
+        ``allowed`` (sorted doc ids) restricts the search to a partition: only
+        the query terms' postings inside it are scored.
+        """
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        if not term_ids or k <= 0:
+            return []
+
+        terms = sorted(term_ids, key=lambda t: self._offsets[t + 1] - self._offsets[t])
+        # Upper bound on what the terms after position i can still add
+        remaining_bounds = np.cumsum(self._max_weights[terms][::-1])[::-1][1:].tolist() + [0.0]
+
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        seen = []
+        for split, term_id in enumerate(terms):
+            doc_ids, weights = self._postings(term_id)
+            if allowed is not None:
+                doc_ids, weights = _restrict(doc_ids, weights, allowed)
+            # Doc ids are unique within one posting list, so fancy-index add is safe
+            scores[doc_ids] += weights
+            seen.append(doc_ids)
+
+            bound = remaining_bounds[split]
+            candidates = np.unique(np.concatenate(seen)) if len(seen) > 1 else doc_ids
+            if len(candidates) < k and bound > 0:
+                continue
+
+            candidate_scores = scores[candidates]
+            if bound > 0:
+                top_k = min(k, len(candidates))
+                threshold = np.partition(candidate_scores, len(candidates) - top_k)[len(candidates) - top_k]
+                if threshold < bound:
+                    continue
+                # Unseen documents are ruled out; finish scoring the candidates
+                self._add_postings(candidates, candidate_scores, terms[split + 1:])
+            break
+
+        top_k = min(k, len(candidates))
+        if top_k == 0:
+            return []
+        top = np.argpartition(-candidate_scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-candidate_scores[top])]
+        return [(int(candidates[i]), float(candidate_scores[i])) for i in top]
+
+    def memory_bytes(self):
+        return self._doc_ids.nbytes + self._weights.nbytes + self._offsets.nbytes + self._max_weights.nbytes
+
+
+def _restrict(doc_ids, weights, allowed):
+    """The postings whose doc id is in the sorted ``allowed`` array."""
+    if not len(allowed):
+        return doc_ids[:0], weights[:0]
+    positions = np.minimum(np.searchsorted(allowed, doc_ids), len(allowed) - 1)
+    hits = allowed[positions] == doc_ids
+    return doc_ids[hits], weights[hits]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked lists of IDs; returns ``{id: score}`` with score = sum 1 / (k + rank)."""
+    fused = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return fused
@@ -0,0 +1,18 @@
+"""Cache location and content hashing shared by the on-disk caches.
+
+Kept free of heavy imports so the response cache, embedding cache and reranker
+can be imported without loading FAISS or LangChain.
+"""
+import hashlib
+import os
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "medassist")
+
+
+def get_cache_dir():
+    """Root directory for all on-disk caches (override with MEDASSIST_CACHE_DIR)."""
+    return os.getenv("MEDASSIST_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,136 @@
+"""Memory-mapped, read-only chunk storage for the cached knowledge index.
+
+LangChain pickles the whole docstore next to the FAISS index, so every process
+that loads it holds a private copy of every chunk. Here chunks are written once
+as ``chunks.jsonl`` (one ``{"page_content", "metadata"}`` object per FAISS
+position) plus ``chunks.offsets.npy`` with the byte offset of each line. Both
+files are memory-mapped, so all processes on a host share one page-cache copy
+and a chunk is only decoded when a search returns it. ``chunks.documents.json``
+maps each document ID (the ``source`` metadata) to its runs of positions, so
+incremental updates find a document's chunks without decoding them all.
+"""
+import json
+import mmap
+import os
+from array import array
+from collections.abc import Mapping
+
+import numpy as np
+from langchain.schema import Document
+from langchain_community.docstore.base import Docstore
+
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "chunks.offsets.npy"
+DOCUMENTS_FILE = "chunks.documents.json"
+
+
+def _add_position(runs, doc_id, position):
+    doc_runs = runs.setdefault(doc_id, [])
+    if doc_runs and doc_runs[-1][1] == position:
+        doc_runs[-1][1] = position + 1
+    else:
+        doc_runs.append([position, position + 1])
+
+
+def document_runs(documents):
+    """``{document ID: [[start, end), ...]}`` for documents in position order."""
+    runs = {}
+    for position, doc in enumerate(documents):
+        _add_position(runs, doc.metadata.get("source"), position)
+    return runs
+
+
+class ChunkWriter:
+    """Appends chunks in FAISS position order; ``close`` writes the offsets and document runs.
+
+    Only the line offsets (8 bytes per chunk) stay in memory, so ingestion can
+    stream chunks straight to disk and open them as a ChunkStore afterwards.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._file = open(os.path.join(directory, CHUNKS_FILE), "wb")
+        self._offsets = array("q", [0])
+        self._runs = {}
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def add(self, page_content, metadata):
+        position = len(self)
+        line = json.dumps({"page_content": page_content, "metadata": metadata}, ensure_ascii=False)
+        self._file.write(line.encode("utf-8") + b"\n")
+        self._offsets.append(self._file.tell())
+        _add_position(self._runs, metadata.get("source"), position)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        np.save(os.path.join(self.directory, OFFSETS_FILE), np.frombuffer(self._offsets, dtype=np.int64))
+        with open(os.path.join(self.directory, DOCUMENTS_FILE), "w", encoding="utf-8") as f:
+            json.dump(self._runs, f)
+
+
+def write_chunks(directory, documents):
+    """Write documents in FAISS position order as JSONL plus a line-offset array."""
+    writer = ChunkWriter(directory)
+    for doc in documents:
+        writer.add(doc.page_content, doc.metadata)
+    writer.close()
+
+
+class ChunkStore(Docstore):
+    """Read-only docstore whose IDs are FAISS positions as strings."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r")
+        self._mmap = None
+        if len(self) > 0:
+            with open(os.path.join(directory, CHUNKS_FILE), "rb") as f:
+                # The mapping stays valid after the file object is closed
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def get(self, position):
+        start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+        record = json.loads(self._mmap[start:end])
+        return Document(page_content=record["page_content"], metadata=record["metadata"])
+
+    def document_runs(self):
+        """Position runs per document ID (decodes every chunk for entries written before they were saved)."""
+        path = os.path.join(self.directory, DOCUMENTS_FILE)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return document_runs(self.get(position) for position in range(len(self)))
+
+    def search(self, search):
+        try:
+            position = int(search)
+        except ValueError:
+            position = -1
+        if not 0 <= position < len(self):
+            return f"ID {search} not found."
+        return self.get(position)
+
+
+class PositionIds(Mapping):
+    """``index_to_docstore_id`` for a ChunkStore without a per-chunk dict."""
+
+    def __init__(self, size):
+        self._size = size
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._size:
+            raise KeyError(position)
+        return str(position)
+
+    def __iter__(self):
+        return iter(range(self._size))
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,189 @@
+"""OpenAI chat-completions client used by the RAG pipeline."""
+import json
+import os
+
+from medassist.http_client import CircuitOpenError, get_http_session, get_openai_circuit_breaker, post_with_retries
+from medassist.response_cache import get_response_cache, payload_cache_key
+
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+def openai_base_url():
+    """Root of the OpenAI-compatible API; set OPENAI_BASE_URL for a proxy or a local mock server"""
+    return os.getenv("OPENAI_BASE_URL", DEFAULT_OPENAI_BASE_URL).rstrip("/")
+
+def cache_namespace_for(base_url):
+    """None for the public API, else the base URL: keeps a mock or proxy's answers out of the real caches"""
+    base_url = base_url.rstrip("/")
+    return None if base_url == DEFAULT_OPENAI_BASE_URL else base_url
+
+class ChatStream:
+    """Iterator of response text deltas from ``MedicalAIClient.generate_stream``.
+
+    ``completed`` becomes True only once the API signalled the end of the
+    answer (``[DONE]``) or it came from the response cache. A stream that
+    breaks off early yields an error marker instead and stays incomplete.
+    """
+
+    def __init__(self):
+        self.completed = False
+        self.deltas = iter(())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.deltas)
+
+class MedicalAIClient:
+    def __init__(self, api_key, use_openai_embeddings=False, use_response_cache=True, base_url=None):
+        self.api_key = api_key
+        self.use_openai_embeddings = use_openai_embeddings
+        base_url = (base_url or openai_base_url()).rstrip("/")
+        self.chat_completions_url = f"{base_url}/chat/completions"
+        self.cache_namespace = cache_namespace_for(base_url)
+        # Keep-alive pool and circuit breaker are shared by every session in the process
+        self.session = get_http_session()
+        self.circuit_breaker = get_openai_circuit_breaker()
+        # Requests run at temperature 0, so identical payloads can be answered from disk
+        self.response_cache = get_response_cache() if use_response_cache else None
+    
+    def is_configured(self):
+        return bool(self.api_key and self.api_key.startswith('sk-'))
+    
+    def _headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _payload(self, prompt, model, max_tokens, stream=False):
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0
+        }
+        if stream:
+            data["stream"] = True
+        return data
+    
+    def _post(self, data, stream=False):
+        return post_with_retries(
+            self.session,
+            self.chat_completions_url,
+            breaker=self.circuit_breaker,
+            headers=self._headers(),
+            json=data,
+            timeout=60,
+            stream=stream
+        )
+    
+    @staticmethod
+    def _circuit_open_message(error):
+        return f"❌ OpenAI API is temporarily unavailable. Retrying automatically in {error.retry_in:.0f}s."
+    
+    @staticmethod
+    def _error_message(status_code):
+        if status_code == 401:
+            return "❌ Invalid API key. Please check your OpenAI API key."
+        elif status_code == 429:
+            return "❌ Rate limit exceeded. Please try again in a moment."
+        else:
+            return f"❌ OpenAI API Error: {status_code}"
+    
+    def generate(self, prompt, model="gpt-3.5-turbo", max_tokens=512):
+        return self.complete(prompt, model=model, max_tokens=max_tokens)[0]
+    
+    def complete(self, prompt, model="gpt-3.5-turbo", max_tokens=512):
+        """(text, completed): ``completed`` only for a full answer from the API or the response cache"""
+        if not self.is_configured():
+            return "❌ OpenAI API key not configured", False
+        
+        try:
+            data = self._payload(prompt, model, max_tokens)
+            cache_key = payload_cache_key(data, self.cache_namespace)
+            if self.response_cache is not None:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return cached, True
+            
+            response = self._post(data)
+            
+            if response.status_code == 200:
+                content = response.json()["choices"][0]["message"]["content"].strip()
+                if self.response_cache is not None:
+                    self.response_cache.put(cache_key, content)
+                return content, True
+            else:
+                return self._error_message(response.status_code), False
+                
+        except CircuitOpenError as e:
+            return self._circuit_open_message(e), False
+        except Exception as e:
+            return f"❌ Connection Error: {str(e)}", False
+    
+    def generate_stream(self, prompt, model="gpt-3.5-turbo", max_tokens=512):
+        """Stream of response text deltas (server-sent events); see ChatStream for whether it completed"""
+        stream = ChatStream()
+        stream.deltas = self._stream_deltas(stream, prompt, model, max_tokens)
+        return stream
+    
+    def _stream_deltas(self, stream, prompt, model, max_tokens):
+        if not self.is_configured():
+            yield "❌ OpenAI API key not configured"
+            return
+        
+        received_content = False
+        try:
+            data = self._payload(prompt, model, max_tokens, stream=True)
+            cache_key = payload_cache_key(data, self.cache_namespace)
+            if self.response_cache is not None:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    stream.completed = True
+                    yield cached
+                    return
+            
+            response = self._post(data, stream=True)
+            streamed = []
+            
+            with response:
+                if response.status_code != 200:
+                    yield self._error_message(response.status_code)
+                    return
+                
+                # Decode bytes ourselves: event streams rarely declare a charset
+                for line in response.iter_lines():
+                    line = line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        # Only a stream that ran to completion is worth caching
+                        stream.completed = True
+                        if self.response_cache is not None:
+                            self.response_cache.put(cache_key, "".join(streamed).strip())
+                        break
+                    
+                    choices = json.loads(payload).get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if not received_content and delta:
+                        # Match generate(), which strips leading whitespace
+                        delta = delta.lstrip()
+                    if delta:
+                        received_content = True
+                        streamed.append(delta)
+                        yield delta
+            
+            if not stream.completed:
+                # The body ended without [DONE]: what was received is only part of the answer
+                yield "\n\n❌ The response was cut off before it completed." if received_content else \
+                    "❌ The response ended before any content was received."
+                    
+        except CircuitOpenError as e:
+            yield self._circuit_open_message(e)
+        except Exception as e:
+            if received_content:
+                yield f"\n\n❌ Connection Error: {str(e)}"
+            else:
+                yield f"❌ Connection Error: {str(e)}"
@@ -0,0 +1,330 @@
+"""Incremental document updates on top of a built knowledge-base index.
+
+Every chunk carries its document's stable ID, the ``source`` metadata
+(``medical_knowledge_3``, a file path, ...). ``DeltaIndex.upsert`` and
+``delete`` touch only the changed document: its old chunks are tombstoned in
+the base index, which stays read-only and memory-mapped, and its new chunks
+are embedded into a small in-memory delta (an exact FAISS index plus BM25).
+Retrieval searches both and drops tombstoned chunks, so updating one guideline
+costs one document's embeddings however large the base index is.
+
+Each change is appended to a JSONL change log under the cache directory before
+it is applied, and replayed when the same base index is loaded again. Replays
+re-embed through the embedding cache, so a restart makes no model calls. Every
+process serving the index applies the log in order from its own byte offset,
+so a change made through one API worker reaches the others on their next
+``replay`` (see medassist.index_registry).
+
+Delta positions continue after the base (``base_size + i``), so the retriever
+sees one position space. Searches read an immutable ``DeltaSnapshot`` that
+each change replaces, so they never take the update lock.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+import faiss
+import numpy as np
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from medassist.bm25 import BM25Index
+from medassist.cache_common import get_cache_dir
+from medassist.chunk_store import document_runs
+
+
+# Metadata that describes one chunk rather than its document
+_CHUNK_METADATA = ("source", "page")
+
+
+def change_log_path(kb_version):
+    return os.path.join(get_cache_dir(), "changes", f"{kb_version}.jsonl")
+
+
+def _take(distances, positions, deleted, k, ascending):
+    """Best ``k`` live hits of one query, padded like a FAISS result row."""
+    order = np.argsort(distances if ascending else -distances, kind="stable")
+    row_distances = np.full(k, np.inf if ascending else -np.inf, dtype=np.float32)
+    row_positions = np.full(k, -1, dtype=np.int64)
+    count = 0
+    for i in order:
+        position = int(positions[i])
+        if position == -1 or position in deleted:
+            continue
+        row_distances[count], row_positions[count] = distances[i], position
+        count += 1
+        if count == k:
+            break
+    return row_distances, row_positions
+
+
+class DeltaSnapshot:
+    """Immutable view of the base index plus the changes applied so far."""
+
+    def __init__(self, base, lexical_index, documents, vectors, deleted, revision):
+        self.base = base
+        self.lexical_index = lexical_index
+        self.base_size = base.index.ntotal
+        self.documents = documents
+        self.vectors = vectors
+        self.deleted = deleted
+        self.revision = revision
+        self.base_deleted = sum(1 for position in deleted if position < self.base_size)
+        self.delta_deleted = len(deleted) - self.base_deleted
+
+        self.index = faiss.IndexFlat(base.index.d, base.index.metric_type)
+        if len(vectors):
+            self.index.add(vectors)
+        self.delta_lexical = BM25Index([doc.page_content for doc in documents]) if documents else None
+
+    def _excluded(self, partitions, values):
+        """Delta positions outside the selected partitions; the delta is small, so it is filtered in place."""
+        values = set(values)
+        return {self.base_size + i for i, doc in enumerate(self.documents)
+                if doc.metadata.get(partitions.field) not in values}
+
+    def search(self, vectors, k, partitions=None, values=None):
+        """FAISS-style (distances, positions) over base and delta without deleted chunks.
+
+        With ``values`` the base is searched through those partitions (see
+        medassist.partitions) and delta chunks outside them are skipped.
+        """
+        ascending = self.base.index.metric_type != faiss.METRIC_INNER_PRODUCT
+        skip = self.deleted
+        # Over-fetch by the tombstone count so k live hits survive the filter
+        if values is None:
+            distances, positions = self.base.index.search(vectors, min(self.base_size, k + self.base_deleted))
+            delta_k = min(self.index.ntotal, k + self.delta_deleted)
+        else:
+            distances, positions = partitions.search(vectors, k + self.base_deleted, values)
+            skip = self.deleted | self._excluded(partitions, values)
+            delta_k = self.index.ntotal
+        if delta_k:
+            delta_distances, delta_positions = self.index.search(vectors, delta_k)
+            delta_positions = np.where(delta_positions >= 0, delta_positions + self.base_size, -1)
+            distances = np.hstack([distances, delta_distances])
+            positions = np.hstack([positions, delta_positions])
+
+        rows = [_take(d, p, skip, k, ascending) for d, p in zip(distances, positions)]
+        return np.vstack([d for d, _ in rows]), np.vstack([p for _, p in rows])
+
+    def lexical_rankings(self, query, k, partitions=None, values=None):
+        """BM25 rankings (base, then delta) of live positions, for rank fusion."""
+        rankings = []
+        allowed, skip, delta_k = None, self.deleted, k + self.delta_deleted
+        if values is not None:
+            allowed = partitions.positions(values)
+            skip = self.deleted | self._excluded(partitions, values)
+            delta_k = len(self.documents)
+        if self.lexical_index is not None:
+            hits = self.lexical_index.search(query, k + self.base_deleted, allowed)
+            rankings.append([p for p, _ in hits if p not in skip][:k])
+        if self.delta_lexical is not None:
+            hits = self.delta_lexical.search(query, delta_k)
+            positions = (self.base_size + p for p, _ in hits)
+            rankings.append([p for p in positions if p not in skip][:k])
+        return rankings
+
+    def partition_counts(self, partitions):
+        """Live chunks per partition value: the base partitions without tombstones, plus the delta."""
+        base_deleted = np.array(sorted(p for p in self.deleted if p < self.base_size), dtype=np.int64)
+        counts = partitions.stats(base_deleted)
+        for i, doc in enumerate(self.documents):
+            value = doc.metadata.get(partitions.field)
+            if value is not None and self.base_size + i not in self.deleted:
+                counts[value] = counts.get(value, 0) + 1
+        return {value: count for value, count in sorted(counts.items()) if count}
+
+    def document(self, position):
+        if position < self.base_size:
+            return self.base.docstore.search(self.base.index_to_docstore_id[position])
+        return self.documents[position - self.base_size]
+
+    def reconstruct(self, position):
+        if position < self.base_size:
+            return self.base.index.reconstruct(position)
+        return self.vectors[position - self.base_size]
+
+
+class DeltaIndex:
+    """Upserts and deletes documents over a shared base index, with a persistent change log."""
+
+    def __init__(self, vectorstore, lexical_index, chunk_size, chunk_overlap, log_path=None):
+        self.vectorstore = vectorstore
+        self.lexical_index = lexical_index
+        self.log_path = log_path
+        self._splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                                        length_function=len)
+        self._documents = []
+        self._vectors = np.zeros((0, vectorstore.index.d), dtype=np.float32)
+        self._deleted = set()
+        # Bytes of the change log applied so far
+        self._log_offset = 0
+        # Document ID -> runs of live positions, read from the base on the first change
+        self._runs = None
+        self._lock = threading.Lock()
+        self.snapshot = DeltaSnapshot(vectorstore, lexical_index, [], self._vectors, frozenset(), 0)
+
+    @property
+    def revision(self):
+        return self.snapshot.revision
+
+    def _document_runs(self):
+        if self._runs is None:
+            docstore = self.vectorstore.docstore
+            if hasattr(docstore, "document_runs"):
+                runs = docstore.document_runs()
+            else:
+                index_to_id = self.vectorstore.index_to_docstore_id
+                runs = document_runs(docstore.search(index_to_id[p]) for p in range(self.vectorstore.index.ntotal))
+            self._runs = {doc_id: [range(start, end) for start, end in doc_runs] for doc_id, doc_runs in runs.items()}
+        return self._runs
+
+    def _embed(self, chunks, embedding):
+        if not chunks:
+            return np.zeros((0, self._vectors.shape[1]), dtype=np.float32)
+        vectors = np.asarray((embedding or self.vectorstore.embedding_function).embed_documents(chunks),
+                             dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _remove(self, doc_id):
+        runs = self._document_runs().pop(doc_id, [])
+        removed = sum(len(run) for run in runs)
+        for run in runs:
+            self._deleted.update(run)
+        return removed
+
+    def _metadata(self, doc_id):
+        """Document-level metadata of a document's current chunks, or {} for a new one."""
+        runs = self._document_runs().get(doc_id)
+        if not runs:
+            return {}
+        position = runs[0].start
+        if position < self.snapshot.base_size:
+            doc = self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[position])
+        else:
+            doc = self._documents[position - self.snapshot.base_size]
+        return {key: value for key, value in doc.metadata.items() if key not in _CHUNK_METADATA}
+
+    def _add(self, doc_id, chunks, vectors, metadata):
+        start = self.snapshot.base_size + len(self._documents)
+        self._documents.extend(Document(page_content=chunk, metadata=dict(metadata or {}, source=doc_id))
+                               for chunk in chunks)
+        self._vectors = np.vstack([self._vectors, vectors])
+        if chunks:
+            self._document_runs()[doc_id] = [range(start, start + len(chunks))]
+
+    def _publish(self, changes=1):
+        self.snapshot = DeltaSnapshot(self.vectorstore, self.lexical_index, list(self._documents), self._vectors,
+                                      frozenset(self._deleted), self.snapshot.revision + changes)
+
+    def _append(self, record):
+        """Append a change to the log; returns its byte offset, or None without a log."""
+        if self.log_path is None:
+            return None
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        record["at"] = datetime.now().isoformat()
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        # A single O_APPEND write, so records from several processes never interleave
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        return end - len(data)
+
+    def _read_new(self):
+        """(offset, record) for every complete record appended since the last read."""
+        if self.log_path is None or not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        records = []
+        for line in data.splitlines(keepends=True):
+            # Another process may still be writing the last record
+            if not line.endswith(b"\n"):
+                break
+            if line.strip():
+                records.append((self._log_offset, json.loads(line)))
+            self._log_offset += len(line)
+        return records
+
+    def _apply(self, record, prepared=None, embedding=None):
+        doc_id = record["doc_id"]
+        if record["op"] != "upsert":
+            return {"doc_id": doc_id, "chunks_added": 0, "chunks_removed": self._remove(doc_id)}
+        if prepared is None:
+            chunks = self._splitter.split_text(record["text"])
+            prepared = chunks, self._embed(chunks, embedding)
+        chunks, vectors = prepared
+        # A replacement keeps its specialty, doc_type, ... unless the update overrides them
+        metadata = dict(self._metadata(doc_id), **(record.get("metadata") or {}))
+        removed = self._remove(doc_id)
+        self._add(doc_id, chunks, vectors, metadata)
+        return {"doc_id": doc_id, "chunks_added": len(chunks), "chunks_removed": removed}
+
+    def _catch_up(self, prepared=None, embedding=None):
+        """Apply new log records in log order; ``prepared`` maps offsets to already embedded chunks.
+
+        Returns {offset: result}. The caller holds the lock.
+        """
+        prepared = prepared or {}
+        results = {offset: self._apply(record, prepared.get(offset), embedding)
+                   for offset, record in self._read_new()}
+        if results:
+            self._publish(len(results))
+        return results
+
+    def _commit(self, record, prepared=None):
+        """Log a change and apply it after any changes other processes logged first."""
+        offset = self._append(record)
+        if offset is None:
+            result = self._apply(record, prepared)
+            self._publish()
+        else:
+            result = self._catch_up({offset: prepared})[offset]
+        return dict(result, revision=self.snapshot.revision)
+
+    def upsert(self, doc_id, text, metadata=None, embedding=None):
+        """Replace (or add) a document: re-chunk and re-embed it, tombstone its old chunks.
+
+        ``metadata`` is merged over the replaced document's, so an update that
+        only changes the text stays in its specialty.
+        """
+        chunks = self._splitter.split_text(text)
+        vectors = self._embed(chunks, embedding)
+        with self._lock:
+            return self._commit({"op": "upsert", "doc_id": doc_id, "text": text, "metadata": metadata},
+                                (chunks, vectors))
+
+    def delete(self, doc_id):
+        """Tombstone every chunk of a document; raises KeyError for an unknown ID."""
+        with self._lock:
+            self._catch_up()
+            if doc_id not in self._document_runs():
+                raise KeyError(doc_id)
+            return self._commit({"op": "delete", "doc_id": doc_id})
+
+    def replay(self, embedding=None):
+        """Apply changes logged since the last call, by this or any other process; returns how many.
+
+        The first call, after loading the base index, replays the whole log.
+        """
+        with self._lock:
+            return len(self._catch_up(embedding=embedding))
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            "revision": snapshot.revision,
+            "base_chunks": snapshot.base_size,
+            "delta_chunks": len(snapshot.documents) - snapshot.delta_deleted,
+            "base_chunks_deleted": snapshot.base_deleted,
+            "documents": len(self._runs) if self._runs is not None else None,
+        }
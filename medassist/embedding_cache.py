@@ -0,0 +1,189 @@
+"""Content-addressed embedding cache shared by documents and queries.
+
+Vectors are stored in SQLite keyed by ``(model, sha256(text))`` so rebuilding
+the index, switching embedding backends back and forth, or asking a repeated
+question never re-embeds text that was already seen. A small in-memory LRU sits
+in front for hot query strings, and the on-disk table is trimmed to
+``max_entries`` least-recently-used rows.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain.schema.embeddings import Embeddings
+
+from medassist.cache_common import get_cache_dir, text_hash
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+class EmbeddingStore:
+    """Thread-safe SQLite store of embedding vectors with LRU trimming."""
+
+    def __init__(self, path, max_entries=200_000, memory_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model, hashes):
+        """Return {hash: vector} for every hash already cached under ``model``."""
+        found = {}
+        with self._lock:
+            pending = []
+            for h in hashes:
+                vector = self._memory.get((model, h))
+                if vector is not None:
+                    self._memory.move_to_end((model, h))
+                    found[h] = vector
+                else:
+                    pending.append(h)
+
+            now = time.time()
+            for start in range(0, len(pending), _SQL_BATCH):
+                batch = pending[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    found[h] = vector
+                    self._remember((model, h), vector)
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        [(now, model, h) for h, _ in rows],
+                    )
+            if pending:
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, model, items):
+        """Store ``(hash, vector)`` pairs and trim the table to ``max_entries``."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, h, np.asarray(v, dtype=np.float32).tobytes(), now) for h, v in items],
+            )
+            for h, v in items:
+                self._remember((model, h), list(v))
+
+            total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if total > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (total - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain ``Embeddings`` wrapper that only embeds text it has not seen.
+
+    ``embed_documents`` does one batched lookup and sends just the misses to the
+    wrapped model in a single call; ``embed_query`` is cached under a separate
+    namespace so models with asymmetric query encoders stay correct.
+    """
+
+    def __init__(self, embeddings, model_name, store):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.store = store
+
+    def _embed_cached(self, namespace, texts):
+        hashes = [text_hash(t) for t in texts]
+        cached = self.store.get_many(namespace, list(dict.fromkeys(hashes)))
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self.store.put_many(namespace, new_items)
+            cached.update(new_items)
+
+        return [list(cached[h]) for h in hashes]
+
+    def embed_documents(self, texts):
+        return self._embed_cached(self.model_name, texts)
+
+    def embed_queries(self, texts):
+        """Batched embed_query with one lookup and one model call for the misses.
+
+        Both supported models embed queries and documents identically, so the
+        misses go through the wrapped model's batched ``embed_documents``.
+        """
+        return self._embed_cached(f"{self.model_name}#query", texts)
+
+    def embed_query(self, text):
+        namespace = f"{self.model_name}#query"
+        h = text_hash(text)
+        cached = self.store.get_many(namespace, [h])
+        if h in cached:
+            return list(cached[h])
+        vector = self.embeddings.embed_query(text)
+        self.store.put_many(namespace, [(h, vector)])
+        return vector
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store():
+    """Process-wide embedding store under the cache directory."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                max_entries = int(os.getenv("MEDASSIST_EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+                _store = EmbeddingStore(os.path.join(get_cache_dir(), "embeddings.sqlite3"), max_entries=max_entries)
+    return _store
@@ -0,0 +1,158 @@
+"""Configurable FAISS index types for the knowledge-base vector store.
+
+A flat index is exact and ideal for the built-in topics, but search cost and
+memory grow linearly with the corpus. For full guideline libraries the index
+can instead be IVF-Flat, IVF-PQ or HNSW:
+
+    MEDASSIST_INDEX_TYPE            flat | ivf | ivfpq | hnsw     (default flat)
+    MEDASSIST_IVF_NLIST             inverted lists (coarse centroids), 1024
+    MEDASSIST_IVF_NPROBE            lists scanned per query, 16
+    MEDASSIST_PQ_M                  PQ sub-quantizers (must divide the dim), 48
+    MEDASSIST_PQ_NBITS              bits per PQ code, 8
+    MEDASSIST_HNSW_M                graph neighbours per node, 32
+    MEDASSIST_HNSW_EF_CONSTRUCTION  build-time beam width, 80
+    MEDASSIST_HNSW_EF_SEARCH        query-time beam width, 64
+    MEDASSIST_INDEX_TRAIN_SAMPLE    vectors sampled to train IVF/PQ, 100000
+    MEDASSIST_VECTOR_STORAGE        float32 | float16 | int8      (default float32)
+    MEDASSIST_RESCORE_FACTOR        re-score k * factor candidates exactly, 0 = off
+
+float16 halves and int8 scalar quantization quarters vector memory for the
+flat, IVF and HNSW types (IVF-PQ is already compressed). With a rescore factor
+the index also keeps the float32 vectors and re-ranks the top candidates with
+exact distances; since cached indexes are memory-mapped, those vectors stay on
+disk and only the candidates' pages are read.
+
+Index specs are plain dicts. Only the build-time fields are part of the on-disk
+cache key; nprobe, efSearch and the rescore factor are applied on every load
+and can be tuned without rebuilding.
+"""
+import os
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "ivfpq", "hnsw")
+
+# index_factory code for each vector storage option
+STORAGE_CODES = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+
+# FAISS k-means wants at least this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+SEARCH_TIME_FIELDS = ("nprobe", "ef_search", "rescore_factor")
+
+
+def index_spec_from_env():
+    """Index spec from the MEDASSIST_* environment variables."""
+    spec = {
+        "type": os.getenv("MEDASSIST_INDEX_TYPE", "flat").lower(),
+        "nlist": int(os.getenv("MEDASSIST_IVF_NLIST", "1024")),
+        "nprobe": int(os.getenv("MEDASSIST_IVF_NPROBE", "16")),
+        "pq_m": int(os.getenv("MEDASSIST_PQ_M", "48")),
+        "pq_nbits": int(os.getenv("MEDASSIST_PQ_NBITS", "8")),
+        "hnsw_m": int(os.getenv("MEDASSIST_HNSW_M", "32")),
+        "ef_construction": int(os.getenv("MEDASSIST_HNSW_EF_CONSTRUCTION", "80")),
+        "ef_search": int(os.getenv("MEDASSIST_HNSW_EF_SEARCH", "64")),
+        "train_sample": int(os.getenv("MEDASSIST_INDEX_TRAIN_SAMPLE", "100000")),
+        "storage": os.getenv("MEDASSIST_VECTOR_STORAGE", "float32").lower(),
+        "rescore_factor": float(os.getenv("MEDASSIST_RESCORE_FACTOR", "0")),
+    }
+    if spec["type"] not in INDEX_TYPES:
+        raise ValueError(f"MEDASSIST_INDEX_TYPE must be one of {', '.join(INDEX_TYPES)}, got {spec['type']!r}")
+    if spec["storage"] not in STORAGE_CODES:
+        raise ValueError(f"MEDASSIST_VECTOR_STORAGE must be one of {', '.join(STORAGE_CODES)}, got {spec['storage']!r}")
+    return spec
+
+
+def build_params(spec):
+    """The part of a spec that changes the built index (used in cache keys)."""
+    params = {key: value for key, value in spec.items() if key not in SEARCH_TIME_FIELDS}
+    # Turning re-scoring on or off changes what is stored; the factor itself does not
+    params["rescore"] = uses_rescoring(spec)
+    return params
+
+
+def uses_rescoring(spec):
+    """Whether the index keeps float32 vectors to re-score lossy search results."""
+    lossy = spec["type"] == "ivfpq" or spec["storage"] != "float32"
+    return lossy and spec["rescore_factor"] > 0
+
+
+def effective_index_spec(spec, num_vectors):
+    """Shrink or downgrade a spec that the corpus is too small to train.
+
+    IVF gets at most one list per MIN_POINTS_PER_CENTROID vectors and falls back
+    to flat below two lists; PQ needs at least 2**nbits training vectors.
+    """
+    spec = dict(spec)
+    if spec["type"] in ("ivf", "ivfpq"):
+        spec["nlist"] = min(spec["nlist"], num_vectors // MIN_POINTS_PER_CENTROID)
+        if spec["nlist"] < 2:
+            spec["type"] = "flat"
+        elif spec["type"] == "ivfpq" and num_vectors < 2 ** spec["pq_nbits"]:
+            spec["type"] = "ivf"
+    return spec
+
+
+def factory_string(spec):
+    """FAISS index_factory description for a spec, e.g. ``IVF1024,SQ8,Refine(Flat)``."""
+    index_type = spec["type"]
+    storage = STORAGE_CODES[spec["storage"]]
+    if index_type == "ivf":
+        description = f"IVF{spec['nlist']},{storage}"
+    elif index_type == "ivfpq":
+        description = f"IVF{spec['nlist']},PQ{spec['pq_m']}x{spec['pq_nbits']}"
+    elif index_type == "hnsw":
+        description = f"HNSW{spec['hnsw_m']}" + ("" if spec["storage"] == "float32" else f",{storage}")
+    else:
+        description = storage
+
+    if uses_rescoring(spec):
+        description += ",Refine(Flat)"
+    return description
+
+
+def _base_index(index):
+    """The searched index underneath an exact re-scoring wrapper."""
+    if isinstance(index, faiss.IndexRefine):
+        return faiss.downcast_index(index.base_index)
+    return index
+
+
+def create_index(vectors, spec, metric=faiss.METRIC_L2):
+    """Empty FAISS index for ``spec``, trained on a sample of ``vectors`` when needed."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    dim = vectors.shape[1]
+    if spec["type"] == "ivfpq" and dim % spec["pq_m"]:
+        raise ValueError(f"MEDASSIST_PQ_M={spec['pq_m']} must divide the embedding dimension {dim}")
+
+    index = faiss.index_factory(dim, factory_string(spec), metric)
+    base = _base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efConstruction = spec["ef_construction"]
+
+    if not index.is_trained:
+        sample = vectors
+        if len(vectors) > spec["train_sample"]:
+            rows = np.random.default_rng(0).choice(len(vectors), spec["train_sample"], replace=False)
+            sample = vectors[np.sort(rows)]
+        index.train(sample)
+
+    configure_search(index, spec)
+    return index
+
+
+def configure_search(index, spec):
+    """Apply query-time knobs; IVF also gets a direct map so vectors can be reconstructed."""
+    if isinstance(index, faiss.IndexRefine):
+        index.k_factor = max(1.0, spec["rescore_factor"])
+
+    base = _base_index(index)
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        ivf.nprobe = min(spec["nprobe"], ivf.nlist)
+        if ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.make_direct_map()
+    elif isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = spec["ef_search"]
+    return index
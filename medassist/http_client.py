@@ -0,0 +1,199 @@
+"""Shared HTTP plumbing for upstream API calls.
+
+One keep-alive ``requests.Session`` is shared by every Streamlit session in the
+process so repeat queries skip TCP/TLS setup. Calls go through
+``post_with_retries``, which retries transient failures with capped exponential
+backoff and full jitter (honoring ``Retry-After``), and through a
+``CircuitBreaker`` that fails fast while the upstream is degraded. Rate
+limiting (429) is retried but never opens the circuit, since it applies to
+one API key rather than to every caller.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session(pool_maxsize=32):
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Retries are handled by post_with_retries, not urllib3
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+    def __init__(self, retry_in):
+        self.retry_in = retry_in
+        super().__init__(f"upstream circuit open, retry in {retry_in:.0f}s")
+
+
+class CircuitBreaker:
+    """Thread-safe closed / open / half-open circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls
+    fail fast for ``reset_timeout`` seconds. Then a single trial call is let
+    through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def _refresh(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go to the upstream now."""
+        with self._lock:
+            self._refresh()
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(retry_in)
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def record_neutral(self):
+        """An outcome that says nothing about upstream health; only frees a half-open trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self):
+        """State summary for display: state, consecutive failures, seconds until retry."""
+        with self._lock:
+            self._refresh()
+            retry_in = 0.0
+            if self._state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {"state": self._state, "failures": self._failures, "retry_in": retry_in}
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=8.0):
+    """Full-jitter exponential backoff for the given 0-based retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def post_with_retries(session, url, breaker=None, max_retries=3, base_delay=0.5,
+                      max_delay=8.0, max_retry_after=20.0, **kwargs):
+    """POST with bounded retries on transient failures, guarded by a circuit breaker.
+
+    Returns the final ``requests.Response`` (which may still be an error status
+    once retries are exhausted or a Retry-After exceeds ``max_retry_after``).
+    Connection errors are re-raised after the last attempt. Raises
+    ``CircuitOpenError`` without touching the network while the circuit is open.
+    """
+    if breaker is not None:
+        breaker.before_call()
+
+    attempt = 0
+    while True:
+        try:
+            response = session.post(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= max_retries:
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+            attempt += 1
+            continue
+        except requests.RequestException:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+
+        if response.status_code not in RETRYABLE_STATUS_CODES:
+            if breaker is not None:
+                breaker.record_success()
+            return response
+
+        delay = parse_retry_after(response.headers.get("Retry-After"))
+        if delay is None:
+            delay = backoff_delay(attempt, base_delay, max_delay)
+        if attempt >= max_retries or delay > max_retry_after:
+            if breaker is not None:
+                # 429 is per API key, not an outage; one throttled key must not open the circuit for all
+                if response.status_code == 429:
+                    breaker.record_neutral()
+                else:
+                    breaker.record_failure()
+            return response
+
+        # Release the pooled connection before sleeping
+        response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+_openai_breaker = CircuitBreaker()
+
+
+def get_openai_circuit_breaker():
+    """Process-wide circuit breaker for the OpenAI API."""
+    return _openai_breaker
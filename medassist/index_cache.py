@@ -0,0 +1,153 @@
+"""Persistent on-disk cache for the FAISS medical knowledge index.
+
+Building the index means chunking the whole corpus and embedding every chunk,
+which dominates cold start. The built index and its chunk docstore are saved
+under a directory keyed by a hash of everything that affects the result: the
+corpus file, the splitter settings and the embedding model. A warm restart with
+the same inputs loads the saved index instead of re-embedding.
+
+Entries are laid out for memory mapping: ``index.faiss`` is opened with FAISS's
+mmap flag, chunk texts live in a ChunkStore, BM25 postings in ``.npy`` arrays
+and per-specialty sub-indexes (see medassist.partitions) under ``partitions/``.
+Every process on a host then shares one page-cache copy of the index instead
+of holding its own, and loading is near-instant. Set MEDASSIST_INDEX_MMAP=0 to
+read the FAISS index into process memory instead.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+from medassist.bm25 import BM25Index
+from medassist.cache_common import get_cache_dir
+from medassist.chunk_store import ChunkStore, PositionIds, write_chunks
+from medassist.partitions import PartitionedIndex
+
+# Bump when the on-disk layout changes so stale caches are ignored.
+INDEX_CACHE_VERSION = 3
+
+MMAP_INDEX = os.getenv("MEDASSIST_INDEX_MMAP", "1").lower() not in ("0", "false", "no")
+
+def index_cache_key(corpus, chunk_size, chunk_overlap, embedding_model_name, index_params=None, documents=None,
+                    embedding_endpoint=None):
+    """Content hash identifying one built index.
+
+    ``corpus`` is the digest of the corpus file (see medassist.knowledge) and
+    ``documents`` fingerprints ingested files (see medassist.ingest), so
+    neither is read whole to compute the key. ``embedding_endpoint`` is the
+    OpenAI base URL when it is not the public API.
+    """
+    settings = {
+        "version": INDEX_CACHE_VERSION,
+        "corpus": corpus,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "embedding_model": embedding_model_name,
+        "index": index_params,
+    }
+    if documents:
+        # Only present when files are ingested
+        settings["documents"] = documents
+    if embedding_endpoint:
+        # Vectors from a mock server or proxy must not be served against the real API
+        settings["embedding_endpoint"] = embedding_endpoint
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _index_dir(key):
+    return os.path.join(get_cache_dir(), f"faiss_v{INDEX_CACHE_VERSION}", key)
+
+
+def load_cached_index(key, embedding_model):
+    """Return the cached FAISS store and its metadata, or (None, None) on a miss."""
+    index_dir = _index_dir(key)
+    meta_path = os.path.join(index_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None, None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        io_flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if MMAP_INDEX else 0
+        index = faiss.read_index(os.path.join(index_dir, "index.faiss"), io_flags)
+        docstore = ChunkStore(index_dir)
+        vectorstore = FAISS(embedding_model, index, docstore, PositionIds(len(docstore)))
+        return vectorstore, meta
+    except Exception:
+        # A corrupt or partially written entry is treated as a miss and rebuilt
+        return None, None
+
+
+def load_cached_lexical_index(key):
+    """The BM25 index saved alongside a cached FAISS index, or None."""
+    bm25_dir = os.path.join(_index_dir(key), "bm25")
+    if not os.path.isdir(bm25_dir):
+        return None
+    try:
+        return BM25Index.load(bm25_dir, mmap=MMAP_INDEX)
+    except Exception:
+        return None
+
+
+def load_cached_partitions(key):
+    """The specialty sub-indexes saved alongside a cached FAISS index, or None."""
+    partitions_dir = os.path.join(_index_dir(key), "partitions")
+    if not os.path.isdir(partitions_dir):
+        return None
+    try:
+        return PartitionedIndex.load(partitions_dir, mmap=MMAP_INDEX)
+    except Exception:
+        return None
+
+
+def staging_dir(key):
+    """Empty directory to build an index in; ``save_index`` renames it into place.
+
+    Falls back to a system temp directory when the cache is not writable, so
+    chunks still stream to disk.
+    """
+    parent = os.path.dirname(_index_dir(key))
+    try:
+        os.makedirs(parent, exist_ok=True)
+        return tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+    except OSError:
+        return tempfile.mkdtemp(prefix="medassist-index-")
+
+
+def save_index(key, vectorstore, meta, lexical_index=None, partitions=None, build_dir=None):
+    """Persist a built FAISS store (and optional BM25 and sub-indexes) atomically under its cache key.
+
+    ``build_dir`` is the ``staging_dir`` the store's chunks were streamed into;
+    they are then kept in place instead of being rewritten.
+    """
+    index_dir = _index_dir(key)
+    parent = os.path.dirname(index_dir)
+    os.makedirs(parent, exist_ok=True)
+
+    # Write into a sibling temp dir and rename so readers never see a half-written index
+    in_place = build_dir is not None and os.path.dirname(os.path.abspath(build_dir)) == os.path.abspath(parent)
+    tmp_dir = build_dir if in_place else tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+    try:
+        faiss.write_index(vectorstore.index, os.path.join(tmp_dir, "index.faiss"))
+        if not in_place:
+            write_chunks(tmp_dir, (
+                vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+                for position in range(vectorstore.index.ntotal)
+            ))
+        if lexical_index is not None:
+            lexical_index.save(os.path.join(tmp_dir, "bm25"))
+        if partitions is not None:
+            partitions.save(os.path.join(tmp_dir, "partitions"))
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        if os.path.exists(index_dir):
+            shutil.rmtree(index_dir, ignore_errors=True)
+        os.replace(tmp_dir, index_dir)
+    except Exception:
+        if not in_place:
+            # A staging dir still backs the caller's ChunkStore
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
@@ -0,0 +1,223 @@
+"""Version-watched registry of the knowledge base that answers queries.
+
+A knowledge-base version is identified by its kb_version, the index cache key
+of the built-in corpus, the files under MEDASSIST_DOCUMENTS_DIR and the index
+settings. The registry checks it periodically (hashing the inputs, not
+embedding them). When it changes, the new index is loaded (or built) on a
+background thread while the current one keeps serving, then swapped in under
+a lock, so no query ever sees a half-loaded index.
+
+Queries take a lease on the active generation for as long as they use its
+retriever. A superseded generation is retired, and its reference to the shared
+index released, once its last lease is returned; the index itself is freed
+when no registry in the process still serves that version. Publish a version ahead of time with
+``python -m medassist.ingest`` so replicas only load the cached index.
+
+    MEDASSIST_KB_WATCH_INTERVAL     seconds between version checks, 30 (0 disables watching)
+    MEDASSIST_KB_CHANGES_INTERVAL   seconds between change-log polls, 2
+
+Document updates made through the delta (see medassist.delta_index) belong to
+the kb_version they were applied to; a rebuilt version does not carry them.
+The watcher also applies updates that other processes (API workers) appended
+to the active version's change log, so they reach every worker in seconds.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from medassist.warmup import get_index_warmup
+
+WATCH_INTERVAL = float(os.getenv("MEDASSIST_KB_WATCH_INTERVAL", "30"))
+CHANGES_INTERVAL = float(os.getenv("MEDASSIST_KB_CHANGES_INTERVAL", "2"))
+
+
+class IndexGeneration:
+    """One loaded knowledge-base version and the queries still using it."""
+
+    def __init__(self, retriever, stats):
+        self.retriever = retriever
+        self._stats = stats
+        self.kb_version = stats["kb_version"]
+        self.loaded_at = time.time()
+        self.in_flight = 0
+
+    @property
+    def stats(self):
+        """Knowledge-base stats, with chunk, topic and specialty counts as of the latest document update."""
+        from medassist.vectorstore import live_index_stats
+        return live_index_stats(self._stats, self.retriever.delta, self.retriever.partitions)
+
+
+class IndexRegistry:
+    """The active retriever for one embedding configuration, hot-swapped when a new version is published."""
+
+    def __init__(self, use_openai_embeddings=False, api_key=None, interval=WATCH_INTERVAL,
+                 changes_interval=CHANGES_INTERVAL):
+        self.use_openai_embeddings = use_openai_embeddings
+        self.api_key = api_key
+        self.interval = interval
+        self.changes_interval = min(changes_interval, interval)
+        self.swaps = 0
+        self.error = None
+        self._active = None
+        # Superseded generations that still have queries in flight
+        self._retiring = []
+        self._loading = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    @property
+    def active(self):
+        return self._active
+
+    def seed(self, retriever, stats):
+        """Install the first generation; later versions arrive through ``publish``.
+
+        Both take over the retriever's reference to its shared index.
+        """
+        with self._lock:
+            seeded = self._active is None
+            if seeded:
+                self._active = IndexGeneration(retriever, stats)
+        if not seeded:
+            from medassist.vectorstore import release_shared_index
+            release_shared_index(stats["kb_version"])
+        return self._active
+
+    def publish(self, retriever, stats):
+        """Atomically make ``retriever`` the one new queries use; the old one drains in the background."""
+        generation = IndexGeneration(retriever, stats)
+        with self._lock:
+            previous, self._active = self._active, generation
+            if previous is not None:
+                self._retiring.append(previous)
+                self.swaps += 1
+        self._retire_drained()
+        return generation
+
+    def acquire(self):
+        """Lease the active generation; pair with ``release``."""
+        with self._lock:
+            generation = self._active
+            if generation is None:
+                raise RuntimeError("knowledge base is not loaded yet")
+            generation.in_flight += 1
+        return generation
+
+    def release(self, generation):
+        with self._lock:
+            generation.in_flight -= 1
+        self._retire_drained()
+
+    @contextmanager
+    def lease(self):
+        """``(retriever, stats)`` of the active generation, kept alive until the block exits."""
+        generation = self.acquire()
+        try:
+            yield generation.retriever, generation.stats
+        finally:
+            self.release(generation)
+
+    def _retire_drained(self):
+        with self._lock:
+            drained = [g for g in self._retiring if not g.in_flight]
+            self._retiring = [g for g in self._retiring if g.in_flight]
+        if drained:
+            from medassist.vectorstore import release_shared_index
+            for generation in drained:
+                release_shared_index(generation.kb_version)
+
+    def apply_changes(self):
+        """Apply document updates appended to the active version's change log since the last call."""
+        active = self._active
+        if active is None or active.retriever.delta is None:
+            return 0
+        return active.retriever.delta.replay()
+
+    def check(self):
+        """Apply logged document updates, then start loading a newly published version in the background.
+
+        Returns the new version's kb_version, or None.
+        """
+        from medassist.vectorstore import current_kb_version
+        self.apply_changes()
+        kb_version = current_kb_version(self.use_openai_embeddings, self.api_key)
+        with self._lock:
+            if self._active is None or kb_version in (self._active.kb_version, self._loading):
+                return None
+            self._loading = kb_version
+        threading.Thread(target=self._load, name="medassist-index-reload", daemon=True).start()
+        return kb_version
+
+    def _load(self):
+        try:
+            from medassist.vectorstore import build_medical_retriever
+            retriever, stats = build_medical_retriever(self.use_openai_embeddings, self.api_key)
+        except Exception as e:
+            # The current version keeps serving; the next check retries
+            self.error = e
+        else:
+            self.error = None
+            self.publish(retriever, stats)
+        finally:
+            with self._lock:
+                self._loading = None
+
+    def _watch(self):
+        next_check = time.monotonic() + self.interval
+        while not self._stop.wait(self.changes_interval):
+            try:
+                if time.monotonic() >= next_check:
+                    next_check = time.monotonic() + self.interval
+                    self.check()
+                else:
+                    self.apply_changes()
+            except Exception as e:
+                self.error = e
+
+    def start_watching(self):
+        with self._lock:
+            if self._watcher is None and self.interval > 0:
+                self._watcher = threading.Thread(target=self._watch, name="medassist-index-watch", daemon=True)
+                self._watcher.start()
+        return self
+
+    def stop_watching(self):
+        self._stop.set()
+
+    def status(self):
+        with self._lock:
+            active = self._active
+            return {
+                "kb_version": active.kb_version if active is not None else None,
+                "loaded_at": active.loaded_at if active is not None else None,
+                "in_flight": active.in_flight if active is not None else 0,
+                "loading": self._loading,
+                "retiring": [g.kb_version for g in self._retiring],
+                "swaps": self.swaps,
+                "error": str(self.error) if self.error is not None else None,
+            }
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_index_registry(use_openai_embeddings=False, api_key=None):
+    """Process-wide registry for an embedding configuration, seeded by its warm-up.
+
+    Waits for the warm-up and re-raises its failure, like ``IndexWarmup.result``.
+    """
+    warmup = get_index_warmup(use_openai_embeddings, api_key)
+    warmup.result()
+    key = (warmup.use_openai_embeddings, warmup.api_key)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = IndexRegistry(*key)
+        if registry.active is None:
+            # The build has finished, so this does not block
+            registry.seed(*warmup.take())
+    return registry.start_watching()
@@ -0,0 +1,330 @@
+"""Streaming, parallel ingestion of PDF and text documents.
+
+Large document sets are never held in memory whole. ``iter_page_tasks`` walks
+the files and yields one small task per PDF page (or per ``PAGE_CHARS`` block
+of a text file); a process pool parses and splits pages with a bounded number
+of tasks in flight; chunks are embedded in fixed-size batches and appended to
+the FAISS index as they arrive. Progress is reported in pages per second.
+
+    MEDASSIST_DOCUMENTS_DIR     PDF / text files indexed alongside the built-in topics
+    MEDASSIST_INGEST_WORKERS    parser processes, default: CPU count (1 parses inline)
+    MEDASSIST_EMBED_BATCH       chunks per embedding call, 64
+
+Chunk texts are written to a memory-mapped ChunkStore as they are embedded, so
+memory does not grow with the corpus. IVF / IVF-PQ indexes must be trained
+before anything is added, so their vectors are spooled to disk as raw float32
+while a reservoir sample, drawn uniformly from the whole corpus, is kept for
+training; the spool is then added to the trained index in order.
+
+Pages are split independently, so chunks never span a page boundary. Build a
+knowledge base (and warm the on-disk cache) ahead of time with:
+
+    python -m medassist.ingest /data/guidelines --workers 8
+"""
+import argparse
+import functools
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from medassist.chunk_store import ChunkStore, ChunkWriter, PositionIds
+from medassist.faiss_index import configure_search, create_index, effective_index_spec
+
+DOCUMENTS_DIR = os.getenv("MEDASSIST_DOCUMENTS_DIR")
+INGEST_WORKERS = int(os.getenv("MEDASSIST_INGEST_WORKERS", str(os.cpu_count() or 1)))
+EMBED_BATCH = int(os.getenv("MEDASSIST_EMBED_BATCH", "64"))
+
+DOCUMENT_EXTENSIONS = (".pdf", ".txt", ".md")
+
+# Text files are cut into pseudo-pages of about this many characters
+PAGE_CHARS = 4000
+
+# Index types that must see training vectors before anything can be added
+_TRAINED_TYPES = ("ivf", "ivfpq")
+
+
+def find_documents(paths):
+    """Sorted PDF / text files under ``paths`` (files or directories)."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.extend(os.path.join(root, name) for name in names if name.lower().endswith(DOCUMENT_EXTENSIONS))
+        elif path.lower().endswith(DOCUMENT_EXTENSIONS):
+            found.append(path)
+    return sorted(found)
+
+
+def documents_fingerprint(files):
+    """Path, size and mtime of each file, for the index cache key."""
+    fingerprint = []
+    for path in files:
+        stat = os.stat(path)
+        fingerprint.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def count_pages(path):
+    """Pages in a PDF, or the pseudo-page estimate for a text file."""
+    if path.lower().endswith(".pdf"):
+        import fitz
+        with fitz.open(path) as doc:
+            return doc.page_count
+    return max(1, -(-os.path.getsize(path) // PAGE_CHARS))
+
+
+def _text_pages(path):
+    page, size = [], 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            page.append(line)
+            size += len(line)
+            if size >= PAGE_CHARS:
+                yield "".join(page)
+                page, size = [], 0
+    if page:
+        yield "".join(page)
+
+
+def iter_page_tasks(files, records=(), page_counts=None):
+    """Yield one parse task per page: ``(metadata, pdf_path, text)``.
+
+    PDF tasks carry only the path (the page number is in the metadata), so
+    pages are read in the workers; text-file tasks and corpus ``records`` (see
+    medassist.knowledge) carry their text. ``page_counts`` (``{path: pages}``,
+    from ``count_pages``) saves opening every PDF a second time.
+    """
+    for record in records:
+        yield {key: value for key, value in record.items() if key != "text"}, None, record["text"]
+    for path in files:
+        if path.lower().endswith(".pdf"):
+            pages = page_counts[path] if page_counts and path in page_counts else count_pages(path)
+            for page in range(pages):
+                yield {"source": path, "page": page + 1, "doc_type": "document"}, path, None
+        else:
+            for page, text in enumerate(_text_pages(path), 1):
+                yield {"source": path, "page": page, "doc_type": "document"}, None, text
+
+
+@functools.lru_cache(maxsize=8)
+def _open_pdf(path):
+    import fitz
+    return fitz.open(path)
+
+
+@functools.lru_cache(maxsize=None)
+def _splitter(chunk_size, chunk_overlap):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len)
+
+
+def parse_and_split(task, chunk_size, chunk_overlap):
+    """Worker: (metadata, chunk texts) for one page task."""
+    metadata, pdf_path, text = task
+    if pdf_path is not None:
+        text = _open_pdf(pdf_path)[metadata["page"] - 1].get_text()
+    return metadata, _splitter(chunk_size, chunk_overlap).split_text(text)
+
+
+def _bounded_map(executor, fn, tasks, max_in_flight):
+    """Like ``executor.map`` (results in order) without submitting every task up front."""
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(fn, task))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _VectorSpool:
+    """Embedded vectors waiting for the index to be trained, as raw float32 on disk in arrival order."""
+
+    def __init__(self, path, dim):
+        self.path = path
+        self.dim = dim
+        self.count = 0
+        self._file = open(path, "wb")
+
+    def append(self, vectors):
+        vectors.tofile(self._file)
+        self.count += len(vectors)
+
+    def batches(self, batch_size):
+        self._file.close()
+        vectors = np.memmap(self.path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        for start in range(0, self.count, batch_size):
+            yield np.array(vectors[start:start + batch_size])
+
+    def close(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class DocumentIngestor:
+    """Streams page chunks into a FAISS index and a ChunkStore, building the index on first use.
+
+    Chunk texts are appended to ``directory`` as they are embedded (see
+    medassist.chunk_store), so neither the texts nor the vectors of the whole
+    corpus are ever held in memory.
+    """
+
+    def __init__(self, embedding, spec, chunk_size, chunk_overlap, workers=INGEST_WORKERS, batch_size=EMBED_BATCH,
+                 directory=None):
+        self.embedding = embedding
+        self.spec = spec
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.workers = workers
+        self.batch_size = batch_size
+        self.directory = directory or tempfile.mkdtemp(prefix="medassist-chunks-")
+        self.index = None
+        self.pages = 0
+        self.chunks = 0
+        self.seconds = 0.0
+        self._writer = None
+        # IVF / IVF-PQ: vectors spooled until training, and the reservoir sample to train on
+        self._spool = None
+        self._reservoir = None
+        self._rng = np.random.default_rng(0)
+
+    def _append(self, texts, metadatas):
+        vectors = np.asarray(self.embedding.embed_documents(texts), dtype=np.float32)
+        self.chunks += len(texts)
+        for text, metadata in zip(texts, metadatas):
+            self._writer.add(text, metadata)
+        if self.index is not None:
+            self.index.add(vectors)
+        elif self.spec["type"] in _TRAINED_TYPES:
+            if self._spool is None:
+                self._spool = _VectorSpool(os.path.join(self.directory, "vectors.spool"), vectors.shape[1])
+            self._spool.append(vectors)
+            self._sample(vectors)
+        else:
+            self._create_index(vectors)
+            self.index.add(vectors)
+
+    def _sample(self, vectors):
+        """Reservoir sampling (algorithm R): a uniform sample of every vector seen so far."""
+        size = self.spec["train_sample"]
+        seen = self.chunks - len(vectors)
+        fill = max(0, min(len(vectors), size - seen))
+        if fill:
+            if self._reservoir is None or seen + fill > len(self._reservoir):
+                # Grown geometrically up to the sample size, so small corpora stay small
+                grown = np.empty((min(size, max(seen + fill, 2 * seen, 1024)), vectors.shape[1]), dtype=np.float32)
+                if seen:
+                    grown[:seen] = self._reservoir[:seen]
+                self._reservoir = grown
+            self._reservoir[seen:seen + fill] = vectors[:fill]
+        if fill < len(vectors):
+            # Vector i replaces a random slot with probability size / (i + 1)
+            slots = self._rng.integers(0, np.arange(seen + fill, seen + len(vectors)) + 1)
+            keep = slots < size
+            self._reservoir[slots[keep]] = vectors[fill:][keep]
+
+    def _create_index(self, sample):
+        # Trained indexes know the corpus size by now; the others are not sized by it
+        self.spec = effective_index_spec(self.spec, self.chunks)
+        self.index = create_index(sample, self.spec)
+
+    def _add_spooled(self):
+        self._create_index(self._reservoir[:min(self.chunks, self.spec["train_sample"])])
+        self._reservoir = None
+        for vectors in self._spool.batches(self.batch_size):
+            self.index.add(vectors)
+        self._spool.close()
+        self._spool = None
+
+    def _pages(self, tasks):
+        split = functools.partial(parse_and_split, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+        if self.workers <= 1:
+            yield from map(split, tasks)
+            return
+        # The index is usually built on a background thread, where forking is unsafe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context) as executor:
+            yield from _bounded_map(executor, split, tasks, self.workers * 4)
+
+    def ingest(self, tasks, total_pages=None, progress=None):
+        """Parse, split, embed and index every page task; returns a FAISS store over a ChunkStore."""
+        report = progress or (lambda percent, message: None)
+        start = time.perf_counter()
+        texts, metadatas = [], []
+        self._writer = ChunkWriter(self.directory)
+        try:
+            for metadata, chunks in self._pages(tasks):
+                for chunk in chunks:
+                    texts.append(chunk)
+                    metadatas.append(dict(metadata))
+                    if len(texts) == self.batch_size:
+                        self._append(texts, metadatas)
+                        texts, metadatas = [], []
+
+                self.pages += 1
+                self.seconds = time.perf_counter() - start
+                if total_pages:
+                    report(min(99, 100 * self.pages // total_pages),
+                           f"📚 Ingested {self.pages:,}/{total_pages:,} pages ({self.pages / self.seconds:.1f} pages/s)")
+
+            if texts:
+                self._append(texts, metadatas)
+            if self._spool is not None:
+                self._add_spooled()
+        finally:
+            self._writer.close()
+            if self._spool is not None:
+                # A failed ingest leaves no spool behind
+                self._spool.close()
+                self._spool = None
+        if self.index is None:
+            raise ValueError("No text found to index")
+
+        # Direct map entries for IVF are created as vectors are added
+        configure_search(self.index, self.spec)
+        self.seconds = time.perf_counter() - start
+        report(100, f"📚 Ingested {self.pages:,} pages into {self.chunks:,} chunks ({self.stats()['pages_per_second']:.1f} pages/s)")
+        return FAISS(self.embedding, self.index, ChunkStore(self.directory), PositionIds(self.chunks))
+
+    def stats(self):
+        return {
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "seconds": self.seconds,
+            "pages_per_second": self.pages / self.seconds if self.seconds else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF / text files or directories")
+    parser.add_argument("--workers", type=int, help="parser processes (MEDASSIST_INGEST_WORKERS)")
+    parser.add_argument("--batch-size", type=int, help="chunks per embedding call (MEDASSIST_EMBED_BATCH)")
+    parser.add_argument("--openai-embeddings", action="store_true", help="embed with OpenAI (needs OPENAI_API_KEY)")
+    args = parser.parse_args()
+
+    # Set before medassist.vectorstore imports this module's settings
+    if args.workers:
+        os.environ["MEDASSIST_INGEST_WORKERS"] = str(args.workers)
+    if args.batch_size:
+        os.environ["MEDASSIST_EMBED_BATCH"] = str(args.batch_size)
+    from medassist.vectorstore import build_medical_retriever
+
+    _, stats = build_medical_retriever(
+        args.openai_embeddings, os.getenv("OPENAI_API_KEY"),
+        progress=lambda percent, message: print(f"[{percent:3d}%] {message}", flush=True),
+        document_paths=args.paths
+    )
+    print(f"{stats['total_chunks']:,} chunks from {stats['total_topics']:,} documents, "
+          f"{stats['index_type']} index, kb_version {stats['kb_version'][:12]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Built-in medical knowledge corpus.
+
+The corpus is stored as JSONL, one topic per line:
+
+    {"source": "medical_knowledge_0", "specialty": "cardiology", "doc_type": "condition", "version": 1, "text": "..."}
+
+``source`` is the topic's stable document ID (see medassist.delta_index),
+``specialty`` partitions filtered search (see medassist.partitions),
+``doc_type`` is ``condition`` or ``drug`` and ``version`` the topic's revision;
+every field but ``text`` becomes chunk metadata. Records are streamed, so a
+large corpus is never held in memory whole, and the index cache key hashes the
+file's bytes instead of parsing it.
+
+    MEDASSIST_CORPUS_PATH   corpus file, default: medassist/data/medical_knowledge.jsonl
+"""
+import hashlib
+import json
+import os
+
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "medical_knowledge.jsonl")
+CORPUS_PATH = os.getenv("MEDASSIST_CORPUS_PATH", DEFAULT_CORPUS_PATH)
+
+
+def iter_knowledge_records(path=None):
+    """Yield the corpus records in file order."""
+    with open(path or CORPUS_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def count_knowledge_records(path=None):
+    """Number of topics in the corpus, without decoding them."""
+    with open(path or CORPUS_PATH, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+# (path, size, mtime) -> digest, so periodic version checks do not re-read an unchanged corpus
+_digests = {}
+
+
+def corpus_digest(path=None):
+    """SHA-256 of the corpus file, for the index cache key; rehashed only when its size or mtime changes."""
+    path = os.path.abspath(path or CORPUS_PATH)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(key)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        # Only the latest state of each file is worth keeping
+        for stale in [k for k in _digests if k[0] == path]:
+            _digests.pop(stale, None)
+        _digests[key] = digest
+    return digest
+
+
+def load_comprehensive_medical_knowledge():
+    """Load comprehensive medical knowledge base"""
+    return [record["text"] for record in iter_knowledge_records()]
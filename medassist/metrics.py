@@ -0,0 +1,117 @@
+"""Small latency statistics helpers shared by the app, CLI tools and benchmarks."""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (``q`` in 0-100) of a non-empty sequence."""
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("percentile of empty sequence")
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/max in milliseconds for a list of durations in seconds."""
+    if not seconds:
+        return {"count": 0}
+    return {
+        "count": len(seconds),
+        "p50_ms": percentile(seconds, 50) * 1000,
+        "p95_ms": percentile(seconds, 95) * 1000,
+        "p99_ms": percentile(seconds, 99) * 1000,
+        "max_ms": max(seconds) * 1000,
+    }
+
+
+class StageLatencies:
+    """Rolling window of recent durations per pipeline stage."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def summary(self):
+        """``{stage: latency_summary}`` over each stage's window."""
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+        return {stage: latency_summary(values) for stage, values in samples.items()}
+
+
+class StageTimer:
+    """Per-request breakdown of time spent in each pipeline stage.
+
+    Every stage is also recorded into ``latencies`` (a StageLatencies) so p95
+    per stage can be watched across requests.
+    """
+
+    def __init__(self, latencies=None):
+        self.latencies = latencies
+        self.durations = {}
+
+    def record(self, stage, seconds):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        if self.latencies is not None:
+            self.latencies.record(stage, seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def breakdown_ms(self):
+        return {stage: round(seconds * 1000, 1) for stage, seconds in self.durations.items()}
+
+
+_stage_latencies = StageLatencies()
+
+
+def get_stage_latencies():
+    """Process-wide per-stage latency window fed by the RAG pipeline."""
+    return _stage_latencies
+
+
+class TokenSavings:
+    """Running totals of prompt tokens saved by adaptive retrieval depth."""
+
+    def __init__(self):
+        self.queries = 0
+        self.tokens_saved = 0
+        self.chunks_dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, tokens_saved, chunks_dropped):
+        with self._lock:
+            self.queries += 1
+            self.tokens_saved += tokens_saved
+            self.chunks_dropped += chunks_dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "tokens_saved": self.tokens_saved,
+                "avg_tokens_saved": self.tokens_saved / self.queries if self.queries else 0.0,
+                "chunks_dropped": self.chunks_dropped,
+            }
+
+
+_token_savings = TokenSavings()
+
+
+def get_token_savings():
+    """Process-wide adaptive-depth savings counters."""
+    return _token_savings
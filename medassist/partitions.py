@@ -0,0 +1,139 @@
+"""Per-specialty sub-indexes for metadata-filtered retrieval.
+
+Post-filtering a global top-k by specialty both wastes the search and can
+return fewer than k hits when the specialty is rare. Instead every chunk
+tagged with a ``specialty`` (see medassist.knowledge) is also added to a
+sub-index holding only that specialty's vectors, with a sorted array mapping
+its local IDs back to positions in the main index. A filtered query searches
+just the selected partitions and merges their hits, so its cost grows with the
+partition, not the corpus.
+
+Partitions use the main index's spec, scaled down to their size (see
+``effective_index_spec``), and are saved with it in the index cache under
+``partitions/``. Untagged chunks (ingested files) belong to no partition.
+"""
+import json
+import os
+from array import array
+
+import faiss
+import numpy as np
+
+from medassist.faiss_index import configure_search, create_index, effective_index_spec
+
+PARTITION_FIELD = "specialty"
+
+
+def partition_positions(documents, field=PARTITION_FIELD):
+    """``{tag: sorted positions}`` for documents in position order."""
+    positions = {}
+    for position, doc in enumerate(documents):
+        value = doc.metadata.get(field)
+        if value is not None:
+            positions.setdefault(value, array("q")).append(position)
+    return {value: np.frombuffer(found, dtype=np.int64) for value, found in positions.items()}
+
+
+class PartitionedIndex:
+    """FAISS sub-indexes by tag value, searched in place of the main index for filtered queries."""
+
+    def __init__(self, partitions, field=PARTITION_FIELD):
+        # tag value -> (FAISS index, main-index position of each local ID)
+        self.partitions = partitions
+        self.field = field
+
+    @classmethod
+    def build(cls, index, positions, spec, field=PARTITION_FIELD):
+        """Sub-indexes over the vectors stored in ``index`` for each ``{value: positions}``."""
+        partitions = {}
+        for value, value_positions in positions.items():
+            vectors = index.reconstruct_batch(value_positions)
+            value_spec = effective_index_spec(spec, len(vectors))
+            sub_index = create_index(vectors, value_spec, index.metric_type)
+            sub_index.add(vectors)
+            configure_search(sub_index, value_spec)
+            partitions[value] = (sub_index, value_positions)
+        return cls(partitions, field)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, spec, field=PARTITION_FIELD):
+        """Partition a FAISS store's chunks by their ``field`` metadata."""
+        documents = (
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+            for position in range(vectorstore.index.ntotal)
+        )
+        return cls.build(vectorstore.index, partition_positions(documents, field), spec, field)
+
+    @property
+    def values(self):
+        return sorted(self.partitions)
+
+    def positions(self, values):
+        """Sorted main-index positions of the chunks tagged with any of ``values``."""
+        found = [self.partitions[value][1] for value in values if value in self.partitions]
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return found[0] if len(found) == 1 else np.sort(np.concatenate(found))
+
+    def search(self, vectors, k, values):
+        """FAISS-style (distances, main-index positions) over the selected partitions only."""
+        searched = [self.partitions[value] for value in values if value in self.partitions]
+        distances = np.full((len(vectors), k), np.inf, dtype=np.float32)
+        positions = np.full((len(vectors), k), -1, dtype=np.int64)
+        if not searched:
+            return distances, positions
+
+        row_distances, row_positions = [], []
+        for sub_index, value_positions in searched:
+            sub_distances, local = sub_index.search(vectors, min(k, sub_index.ntotal))
+            row_distances.append(sub_distances)
+            row_positions.append(np.where(local >= 0, value_positions[np.maximum(local, 0)], -1))
+        merged_distances, merged_positions = np.hstack(row_distances), np.hstack(row_positions)
+
+        # Best k per query across partitions; padding (-1) sorts last either way
+        ascending = searched[0][0].metric_type != faiss.METRIC_INNER_PRODUCT
+        order = np.argsort(merged_distances if ascending else -merged_distances, axis=1, kind="stable")[:, :k]
+        found = order.shape[1]
+        if not ascending:
+            distances[:] = -np.inf
+        distances[:, :found] = np.take_along_axis(merged_distances, order, axis=1)
+        positions[:, :found] = np.take_along_axis(merged_positions, order, axis=1)
+        return distances, positions
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        values = {}
+        for i, (value, (sub_index, value_positions)) in enumerate(sorted(self.partitions.items())):
+            faiss.write_index(sub_index, os.path.join(directory, f"{i}.faiss"))
+            np.save(os.path.join(directory, f"{i}.positions.npy"), value_positions)
+            values[value] = i
+        with open(os.path.join(directory, "partitions.json"), "w", encoding="utf-8") as f:
+            json.dump({"field": self.field, "values": values}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, "partitions.json"), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        io_flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        partitions = {}
+        for value, i in header["values"].items():
+            sub_index = faiss.read_index(os.path.join(directory, f"{i}.faiss"), io_flags)
+            value_positions = np.load(os.path.join(directory, f"{i}.positions.npy"), mmap_mode="r" if mmap else None)
+            partitions[value] = (sub_index, value_positions.view(np.ndarray))
+        return cls(partitions, header["field"])
+
+    def configure(self, spec):
+        """Apply query-time knobs (nprobe, efSearch) after loading."""
+        for value, (sub_index, value_positions) in self.partitions.items():
+            configure_search(sub_index, effective_index_spec(spec, len(value_positions)))
+
+    def stats(self, deleted=None):
+        """Chunks per tag value, not counting the main-index positions in ``deleted`` (a sorted array)."""
+        counts = {}
+        for value, (_, value_positions) in sorted(self.partitions.items()):
+            count = len(value_positions)
+            if deleted is not None and len(deleted) and count:
+                found = np.minimum(np.searchsorted(value_positions, deleted), count - 1)
+                count -= int(np.count_nonzero(value_positions[found] == deleted))
+            counts[value] = count
+        return counts
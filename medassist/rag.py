@@ -0,0 +1,278 @@
+"""Retrieval-augmented answer generation over the medical knowledge base."""
+import logging
+import os
+import time
+
+from medassist.metrics import StageTimer, get_stage_latencies, get_token_savings
+from medassist.rerank import RERANK_FETCH_K, RERANK_TOP_N, get_reranker
+from medassist.semantic_cache import get_semantic_cache
+from medassist.tokens import count_tokens, pack_context
+
+MEDICAL_SYSTEM_MESSAGE = """You are MedAssist AI, an advanced medical AI assistant with access to comprehensive medical knowledge.
+
+GUIDELINES:
+- Answer based ONLY on the provided medical context from your knowledge base
+- Structure responses clearly with relevant medical sections when appropriate
+- Use appropriate medical terminology while remaining accessible to healthcare professionals
+- If the context lacks specific information, acknowledge this limitation clearly
+- For treatment questions, present evidence-based options systematically
+- Include relevant dosages, contraindications, and monitoring parameters when discussing medications
+- Always emphasize consulting with healthcare professionals for diagnosis and treatment decisions
+- Provide differential diagnoses when relevant
+
+RESPONSE FORMAT:
+- Use clear headings when appropriate (## Symptoms, ## Diagnosis, ## Treatment, ## Monitoring)
+- Use bullet points for lists of symptoms, treatments, or differential diagnoses
+- **Bold** key medical terms, conditions, and medications
+- Include specific dosages and clinical guidelines when available"""
+
+MAX_CONTEXT_TOKENS = 2000
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# Adaptive retrieval depth: chunks below the relevance floor, or after the first
+# drop in relevance larger than the gap, never reach the prompt
+MIN_RELEVANCE = float(os.getenv("MEDASSIST_MIN_RELEVANCE", "0.0"))
+MAX_SCORE_GAP = float(os.getenv("MEDASSIST_MAX_SCORE_GAP", "0.15"))
+
+# Minimum question similarity for reusing a cached answer
+DEFAULT_SEMANTIC_THRESHOLD = float(os.getenv("MEDASSIST_SEMANTIC_THRESHOLD", "0.95"))
+
+NO_CONTEXT_RESPONSE = "⚠️ No relevant medical information found in the knowledge base for this query."
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_DISCLAIMER = "\n\n---\n*Response based on medical knowledge base. Always verify with current medical literature and clinical guidelines.*"
+
+def _to_source(doc, score):
+    return {
+        "source": doc.metadata.get("source", "Medical Knowledge Base"),
+        "specialty": doc.metadata.get("specialty"),
+        "content": doc.page_content,
+        "score": float(score)
+    }
+
+def retrieve_medical_sources(retriever, user_input, k=None):
+    """Top-k chunks for the question (hybrid FAISS + BM25), with their similarity scores"""
+    docs_and_scores = retriever.search_with_scores(user_input, k=k)
+    
+    return [_to_source(doc, score) for doc, score in docs_and_scores]
+
+def retrieve_medical_sources_batch(retriever, questions, k=None):
+    """retrieve_medical_sources for many questions: one embedding call and one FAISS search"""
+    return [
+        [_to_source(doc, score) for doc, score in docs_and_scores]
+        for docs_and_scores in retriever.search_with_scores_batch(list(questions), k=k)
+    ]
+
+def fit_sources_to_budget(sources, max_tokens, max_sources=None, model=None):
+    """Leading sources whose joined context fits in max_tokens (always at least one)"""
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR, model=model)
+    kept, used = [], 0
+    for source in sources[:max_sources]:
+        cost = count_tokens(source["content"], model=model) + (separator_tokens if kept else 0)
+        if kept and used + cost > max_tokens:
+            break
+        kept.append(source)
+        used += cost
+    return kept
+
+def candidate_depth():
+    """Chunks to retrieve per question: over-fetch for the reranker, else the retriever default"""
+    return RERANK_FETCH_K if get_reranker() is not None else None
+
+def filter_by_relevance(sources, min_relevance=None, max_gap=None):
+    """Sources above the relevance floor and before the first large drop in score"""
+    min_relevance = MIN_RELEVANCE if min_relevance is None else min_relevance
+    max_gap = MAX_SCORE_GAP if max_gap is None else max_gap
+    
+    scores = sorted((source["score"] for source in sources if source["score"] >= min_relevance), reverse=True)
+    if not scores:
+        return []
+    
+    cutoff = scores[-1]
+    for higher, lower in zip(scores, scores[1:]):
+        if higher - lower > max_gap:
+            cutoff = higher
+            break
+    
+    # Keep retrieval order (hybrid fusion rank), not score order
+    return [source for source in sources if source["score"] >= cutoff]
+
+def _context_tokens(sources, model=None):
+    if not sources:
+        return 0
+    context = CONTEXT_SEPARATOR.join(source["content"] for source in sources)
+    return min(count_tokens(context, model=model), MAX_CONTEXT_TOKENS)
+
+def _record_depth_savings(baseline, selected, model=None):
+    # Compared with the context the same pipeline builds without adaptive depth
+    saved = _context_tokens(baseline, model) - _context_tokens(selected, model)
+    savings = get_token_savings()
+    savings.record(saved, max(0, len(baseline) - len(selected)))
+    
+    stats = savings.stats()
+    logger.info("Adaptive depth kept %d of %d chunks, saving %d prompt tokens (average %.0f over %d queries)",
+                len(selected), len(baseline), saved, stats["avg_tokens_saved"], stats["queries"])
+
+def select_context_sources(user_input, candidates, model=None, timer=None):
+    """Drop low-relevance candidates, rerank (when enabled) and keep the best that fit the context budget"""
+    reranker = get_reranker()
+    selected = filter_by_relevance(candidates)
+    baseline = candidates
+    
+    if reranker is not None:
+        if selected:
+            timer = timer or StageTimer(get_stage_latencies())
+            with timer.stage("rerank"):
+                ranked = reranker.rerank(user_input, selected)
+            selected = fit_sources_to_budget(ranked, MAX_CONTEXT_TOKENS, RERANK_TOP_N, model=model)
+        baseline = fit_sources_to_budget(candidates, MAX_CONTEXT_TOKENS, RERANK_TOP_N, model=model)
+    
+    if candidates:
+        _record_depth_savings(baseline, selected, model)
+    return selected
+
+def retrieve_context_sources(retriever, user_input, model=None, timer=None):
+    """Sources for the prompt: retrieval, adaptive depth and the optional reranking stage"""
+    timer = timer or StageTimer(get_stage_latencies())
+    with timer.stage("retrieve"):
+        candidates = retrieve_medical_sources(retriever, user_input, k=candidate_depth())
+    return select_context_sources(user_input, candidates, model=model, timer=timer)
+
+def build_medical_rag_prompt(user_input, sources, model=None):
+    """Assemble the RAG prompt from retrieved sources"""
+    # Combine context from retrieved documents
+    context_list = [source["content"] for source in sources]
+    context = CONTEXT_SEPARATOR.join(context_list)
+    
+    # Ensure context fits within token limits, cutting at a sentence end
+    context = pack_context(context, MAX_CONTEXT_TOKENS, model=model)
+    
+    return f"""{MEDICAL_SYSTEM_MESSAGE}
+
+MEDICAL CONTEXT FROM KNOWLEDGE BASE:
+{context}
+
+HEALTHCARE PROFESSIONAL QUESTION:
+{user_input}
+
+MEDICAL RESPONSE (based only on the provided context):"""
+
+def knowledge_base_version(retriever):
+    """kb_version, suffixed with the number of document changes applied since it was built"""
+    kb_version = (retriever.metadata or {}).get("kb_version")
+    delta = getattr(retriever, "delta", None)
+    if delta is not None and delta.revision:
+        return f"{kb_version}+{delta.revision}"
+    return kb_version
+
+def _semantic_cache_namespace(retriever, model, max_tokens):
+    # Answers are only reused for the same knowledge base, specialty filter, chat model and response length
+    specialties = tuple(getattr(retriever, "specialties", None) or ())
+    return (knowledge_base_version(retriever), specialties, model, max_tokens)
+
+def lookup_semantic_answer(retriever, user_input, model, max_tokens, threshold):
+    """Embed the question and look for a cached answer to a near-duplicate; returns (hit, query_vector)"""
+    query_vector = retriever.vectorstore.embedding_function.embed_query(user_input)
+    namespace = _semantic_cache_namespace(retriever, model, max_tokens)
+    return get_semantic_cache().lookup(query_vector, namespace, threshold), query_vector
+
+def store_semantic_answer(retriever, user_input, query_vector, model, max_tokens, response, sources):
+    namespace = _semantic_cache_namespace(retriever, model, max_tokens)
+    get_semantic_cache().store(user_input, query_vector, namespace, response, sources)
+
+def complete_from_sources(ai_client, user_input, sources, model="gpt-3.5-turbo", max_tokens=512):
+    """(answer, completed) for already-retrieved sources; only a completed answer gets the disclaimer"""
+    prompt = build_medical_rag_prompt(user_input, sources, model=model)
+    
+    # Generate response using AI
+    response, completed = ai_client.complete(prompt, model=model, max_tokens=max_tokens)
+    
+    if completed:
+        response += RESPONSE_DISCLAIMER
+    
+    return response, completed
+
+def answer_from_sources(ai_client, user_input, sources, model="gpt-3.5-turbo", max_tokens=512):
+    """LLM answer for already-retrieved sources, with the disclaimer on success"""
+    return complete_from_sources(ai_client, user_input, sources, model=model, max_tokens=max_tokens)[0]
+
+def generate_medical_rag_response(ai_client, retriever, user_input, model="gpt-3.5-turbo", max_tokens=512, semantic_threshold=None, timer=None):
+    """Generate RAG response using FAISS vector search; returns (response, sources)
+
+    With a semantic_threshold, answers to near-duplicate earlier questions are reused.
+    Pass a StageTimer to get the per-stage latency breakdown of this call.
+    """
+    timer = timer or StageTimer(get_stage_latencies())
+    try:
+        query_vector = None
+        if semantic_threshold is not None:
+            with timer.stage("semantic_cache"):
+                cached, query_vector = lookup_semantic_answer(retriever, user_input, model, max_tokens, semantic_threshold)
+            if cached:
+                return cached["response"], cached["sources"]
+        
+        # Retrieve relevant documents from FAISS
+        sources = retrieve_context_sources(retriever, user_input, model=model, timer=timer)
+        
+        if not sources:
+            return NO_CONTEXT_RESPONSE, []
+        
+        with timer.stage("generate"):
+            response, completed = complete_from_sources(ai_client, user_input, sources, model=model, max_tokens=max_tokens)
+        
+        # Only answers the client reports as complete are reused for near-duplicate questions
+        if completed and query_vector is not None:
+            store_semantic_answer(retriever, user_input, query_vector, model, max_tokens, response, sources)
+        
+        return response, sources
+        
+    except Exception as e:
+        return f'❌ Error generating medical response: {str(e)}', []
+
+def stream_medical_rag_response(ai_client, retriever, user_input, model="gpt-3.5-turbo", max_tokens=512, semantic_threshold=None, timer=None):
+    """Retrieve sources up front, then return (sources, iterator of text deltas)"""
+    timer = timer or StageTimer(get_stage_latencies())
+    try:
+        query_vector = None
+        if semantic_threshold is not None:
+            with timer.stage("semantic_cache"):
+                cached, query_vector = lookup_semantic_answer(retriever, user_input, model, max_tokens, semantic_threshold)
+            if cached:
+                return cached["sources"], iter([cached["response"]])
+        
+        sources = retrieve_context_sources(retriever, user_input, model=model, timer=timer)
+    except Exception as e:
+        return [], iter([f'❌ Error generating medical response: {str(e)}'])
+    
+    if not sources:
+        return [], iter([NO_CONTEXT_RESPONSE])
+    
+    return sources, _stream_answer(ai_client, retriever, user_input, sources, model, max_tokens, query_vector, timer)
+
+def _stream_answer(ai_client, retriever, user_input, sources, model, max_tokens, query_vector, timer):
+    """Yield answer deltas, ending with the disclaimer only if the stream completed"""
+    try:
+        prompt = build_medical_rag_prompt(user_input, sources, model=model)
+        
+        streamed = []
+        start = time.perf_counter()
+        stream = ai_client.generate_stream(prompt, model=model, max_tokens=max_tokens)
+        for delta in stream:
+            if not streamed:
+                timer.record("first_token", time.perf_counter() - start)
+            streamed.append(delta)
+            yield delta
+        timer.record("generate", time.perf_counter() - start)
+        
+        # A stream cut off before the end already carries an error marker; it is not a full answer
+        if stream.completed:
+            yield RESPONSE_DISCLAIMER
+            
+            # Only a completed stream is reused for near-duplicate questions
+            if query_vector is not None:
+                store_semantic_answer(retriever, user_input, query_vector, model, max_tokens, "".join(streamed) + RESPONSE_DISCLAIMER, sources)
+        
+    except Exception as e:
+        yield f'❌ Error generating medical response: {str(e)}'
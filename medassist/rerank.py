@@ -0,0 +1,111 @@
+"""Cross-encoder reranking of retrieved chunks.
+
+The bi-encoder ranks chunks by embedding similarity, which lets loosely related
+chunks into the prompt. With reranking enabled, retrieval over-fetches
+``RERANK_FETCH_K`` candidates and a local CPU cross-encoder scores every
+(question, chunk) pair in one batched forward pass; the RAG pipeline then keeps
+the best chunks that fit the context budget. Pair scores are cached in an
+in-memory LRU, so repeated questions and chunks are never re-scored.
+
+    MEDASSIST_RERANK             "1" to enable (default off)
+    MEDASSIST_RERANK_MODEL       cross-encoder model, cross-encoder/ms-marco-MiniLM-L-6-v2
+    MEDASSIST_RERANK_FETCH_K     candidates retrieved before reranking, 25
+    MEDASSIST_RERANK_TOP_N       most chunks kept after reranking, 6
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from medassist.cache_common import text_hash
+
+RERANK = os.getenv("MEDASSIST_RERANK", "0").lower() in ("1", "true", "yes")
+RERANK_MODEL = os.getenv("MEDASSIST_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_FETCH_K = int(os.getenv("MEDASSIST_RERANK_FETCH_K", "25"))
+RERANK_TOP_N = int(os.getenv("MEDASSIST_RERANK_TOP_N", "6"))
+
+
+class CrossEncoderReranker:
+    """Scores (query, passage) pairs with a sentence-transformers CrossEncoder."""
+
+    def __init__(self, model_name=RERANK_MODEL, cache_entries=20_000, max_length=512):
+        self.model_name = model_name
+        self.cache_entries = cache_entries
+        self.max_length = max_length
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self._model
+
+    def score(self, query, passages):
+        """Relevance score per passage; only uncached pairs reach the model, in one batch."""
+        query_hash = text_hash(query)
+        keys = [(query_hash, text_hash(passage)) for passage in passages]
+
+        scores = {}
+        with self._lock:
+            for key in keys:
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    scores[key] = self._scores[key]
+            self.hits += len(scores)
+
+        missing = {}
+        for key, passage in zip(keys, passages):
+            if key not in scores and key not in missing:
+                missing[key] = passage
+
+        if missing:
+            pairs = [(query, passage) for passage in missing.values()]
+            predicted = self._load_model().predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            with self._lock:
+                self.misses += len(missing)
+                for key, value in zip(missing, predicted):
+                    scores[key] = self._scores[key] = float(value)
+                while len(self._scores) > self.cache_entries:
+                    self._scores.popitem(last=False)
+
+        return [scores[key] for key in keys]
+
+    def rerank(self, query, sources):
+        """Source dicts re-ordered best first, each with a ``rerank_score``."""
+        if not sources:
+            return []
+        scores = self.score(query, [source["content"] for source in sources])
+        ranked = [dict(source, rerank_score=score) for source, score in zip(sources, scores)]
+        ranked.sort(key=lambda source: source["rerank_score"], reverse=True)
+        return ranked
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._scores),
+            }
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """Process-wide reranker, or None when reranking is disabled."""
+    global _reranker
+    if not RERANK:
+        return None
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker()
+    return _reranker
@@ -0,0 +1,116 @@
+"""Persistent exact-match cache of LLM responses.
+
+Chat completions are requested at temperature 0, so an identical request
+payload (model, messages, max_tokens, ...) can be answered from disk, including
+after a restart or redeploy. Entries are keyed by a hash of the canonical JSON
+payload, expire after ``max_age_seconds`` and the least recently used ones are
+trimmed beyond ``max_entries``.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from medassist.cache_common import get_cache_dir
+
+
+def payload_cache_key(payload, namespace=None):
+    """Stable hash of a chat-completions request; the stream flag does not change the answer.
+
+    ``namespace`` separates endpoints other than the public API (see
+    medassist.client.cache_namespace_for).
+    """
+    canonical = {key: value for key, value in payload.items() if key != "stream"}
+    if namespace:
+        canonical["namespace"] = namespace
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe SQLite store of response texts with age and size eviction."""
+
+    def __init__(self, path, max_entries=10_000, max_age_seconds=30 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        # Failures are reported as "❌ ..." strings and must never be replayed
+        if not response or response.startswith("❌"):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age_seconds,))
+            total = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if total > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                    (total - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide response cache under the cache directory."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    os.path.join(get_cache_dir(), "responses.sqlite3"),
+                    max_entries=int(os.getenv("MEDASSIST_RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+                    max_age_seconds=float(os.getenv("MEDASSIST_RESPONSE_CACHE_MAX_AGE", str(30 * 24 * 3600))),
+                )
+    return _cache
@@ -0,0 +1,111 @@
+"""Hybrid dense + lexical retriever over the FAISS knowledge base.
+
+FAISS similarity search and BM25 each over-fetch ``fetch_k`` candidates, which
+are fused by reciprocal rank fusion. Every returned chunk still carries its real
+embedding relevance score, so the sources panel and downstream score-based
+logic see comparable numbers whichever path found the chunk. Documents changed
+since the index was built (see medassist.delta_index) are searched through the
+delta's snapshot. A retriever ``filtered`` to some specialties searches only
+their sub-indexes (see medassist.partitions) on both the FAISS and BM25 side.
+"""
+from typing import Any, List, Optional
+
+import faiss
+import numpy as np
+from langchain_core.vectorstores import VectorStoreRetriever
+
+from medassist.bm25 import reciprocal_rank_fusion
+
+
+class HybridRetriever(VectorStoreRetriever):
+    """VectorStoreRetriever that fuses FAISS hits with an optional BM25 index."""
+
+    lexical_index: Optional[Any] = None
+    delta: Optional[Any] = None
+    partitions: Optional[Any] = None
+    specialties: Optional[List[str]] = None
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def filtered(self, specialties):
+        """Copy of this retriever that only searches the given specialties (none: the whole index)."""
+        return self.copy(update={"specialties": sorted(specialties) if specialties else None})
+
+    def _view(self):
+        """The delta snapshot once documents have changed; None keeps the base-only path."""
+        snapshot = self.delta.snapshot if self.delta is not None else None
+        return snapshot if snapshot is not None and snapshot.revision else None
+
+    def _embed_queries(self, queries):
+        embeddings = self.vectorstore.embedding_function
+        if len(queries) == 1:
+            return [embeddings.embed_query(queries[0])]
+        return getattr(embeddings, "embed_queries", embeddings.embed_documents)(list(queries))
+
+    def _distances_to(self, vector, positions, view=None):
+        """Raw FAISS scores between one query vector and stored vectors by position."""
+        index = self.vectorstore.index
+        stored = np.vstack([(view or index).reconstruct(int(position)) for position in positions])
+        if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            return stored @ vector
+        return ((stored - vector) ** 2).sum(axis=1)
+
+    def _search(self, vectors, k, view):
+        if view is not None:
+            return view.search(vectors, k, self.partitions, self.specialties)
+        if self.specialties is not None:
+            return self.partitions.search(vectors, k, self.specialties)
+        return self.vectorstore.index.search(vectors, k)
+
+    def _fuse(self, query, vector, distances, positions, k, view=None, allowed=None):
+        vectorstore = self.vectorstore
+        dense = {int(p): float(d) for d, p in zip(distances, positions) if p != -1}
+        rankings = [[int(p) for p in positions if p != -1]]
+        if self.lexical_index is not None and view is not None:
+            rankings.extend(view.lexical_rankings(query, self.fetch_k, self.partitions, self.specialties))
+        elif self.lexical_index is not None:
+            rankings.append([doc_id for doc_id, _ in self.lexical_index.search(query, self.fetch_k, allowed)])
+
+        fused = reciprocal_rank_fusion(rankings, k=self.rrf_k)
+        top = sorted(fused, key=fused.get, reverse=True)[:k]
+
+        # Lexical-only hits get their embedding score computed from the stored vector
+        lexical_only = [p for p in top if p not in dense]
+        if lexical_only:
+            dense.update(zip(lexical_only, map(float, self._distances_to(vector, lexical_only, view))))
+
+        relevance = vectorstore._select_relevance_score_fn()
+        if view is not None:
+            return [(view.document(p), relevance(dense[p])) for p in top]
+        return [
+            (vectorstore.docstore.search(vectorstore.index_to_docstore_id[p]), relevance(dense[p]))
+            for p in top
+        ]
+
+    def search_with_scores_batch(self, queries, k=None):
+        """Top-k ``(Document, relevance)`` lists for many queries with one embedding call and one FAISS search."""
+        if not queries:
+            return []
+        k = k or self.search_kwargs.get("k", 4)
+        fetch_k = max(k, self.fetch_k) if self.lexical_index is not None else k
+
+        vectors = np.asarray(self._embed_queries(queries), dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(vectors)
+        # One snapshot per batch, so concurrent document updates never mix into a search
+        view = self._view()
+        distances, positions = self._search(vectors, fetch_k, view)
+        allowed = None
+        if self.specialties is not None and view is None and self.lexical_index is not None:
+            allowed = self.partitions.positions(self.specialties)
+
+        return [
+            self._fuse(query, vector, row_distances, row_positions, k, view, allowed)
+            for query, vector, row_distances, row_positions in zip(queries, vectors, distances, positions)
+        ]
+
+    def search_with_scores(self, query, k=None):
+        return self.search_with_scores_batch([query], k=k)[0]
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        return [doc for doc, _ in self.search_with_scores(query)]
@@ -0,0 +1,98 @@
+"""Semantic answer cache for near-duplicate questions.
+
+Answers are stored with the embedding of the question that produced them. A new
+question whose embedding is within a cosine-similarity threshold of a cached one
+(under the same namespace: knowledge-base version, specialty filter, chat model
+and response length) gets the stored answer without retrieval or an LLM call.
+Entries expire after a TTL and the least recently used ones are evicted beyond
+``max_entries``.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def _normalize(vector):
+    # numpy is imported on first use so the cache module stays off the first paint
+    import numpy as np
+
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """Thread-safe in-memory cache of answers keyed by question embeddings."""
+
+    def __init__(self, max_entries=1000, ttl_seconds=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry["created_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, query_vector, namespace, threshold):
+        """Return the best cached entry at or above ``threshold`` cosine similarity, or None."""
+        query = _normalize(query_vector)
+        with self._lock:
+            self._expire(time.time())
+            candidates = [(key, entry) for key, entry in self._entries.items() if entry["namespace"] == namespace]
+            if candidates:
+                import numpy as np
+
+                similarities = np.stack([entry["vector"] for _, entry in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry, similarity=float(similarities[best]))
+            self.misses += 1
+            return None
+
+    def store(self, question, query_vector, namespace, response, sources):
+        with self._lock:
+            self._entries[next(self._ids)] = {
+                "question": question,
+                "vector": _normalize(query_vector),
+                "namespace": namespace,
+                "response": response,
+                "sources": sources,
+                "created_at": time.time(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+_cache = SemanticAnswerCache(
+    max_entries=int(os.getenv("MEDASSIST_SEMANTIC_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=float(os.getenv("MEDASSIST_SEMANTIC_CACHE_TTL", str(24 * 3600))),
+)
+
+
+def get_semantic_cache():
+    """Process-wide semantic answer cache shared by all sessions."""
+    return _cache
@@ -0,0 +1,59 @@
+"""Token counting and context budgeting.
+
+Encoders are memoized per model so each query reuses an already-loaded BPE
+table, and gpt-4o-family models get their own encoding instead of cl100k.
+``pack_context`` fits retrieved context into a token budget with one encode
+call, cutting at the last sentence end inside the budget.
+"""
+import functools
+import re
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# A sentence ends at terminal punctuation followed by whitespace
+_SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model=None):
+    """Return the (cached) tiktoken encoding for a chat model name."""
+    # Imported here so that importing this module stays off the first paint
+    import tiktoken
+
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def count_tokens(text, model=None):
+    return len(get_encoding(model).encode(text))
+
+
+def pack_context(text, max_tokens, model=None):
+    """Truncate ``text`` to at most ``max_tokens``, ending on a sentence boundary.
+
+    Encodes once, decodes the in-budget token prefix and cuts it after its last
+    complete sentence. Falls back to the raw token prefix when the budget does
+    not reach the end of the first sentence.
+    """
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+
+    # Dropping a trailing partial UTF-8 sequence keeps this a true prefix of text
+    prefix = encoding.decode_bytes(tokens[:max_tokens]).decode("utf-8", errors="ignore")
+
+    last_end = None
+    for match in _SENTENCE_END.finditer(prefix):
+        last_end = match.end()
+    # The budget can land exactly on a sentence end whose trailing space was cut off
+    if prefix.endswith((".", "!", "?")) and text[len(prefix):len(prefix) + 1].isspace():
+        last_end = len(prefix)
+
+    if last_end is None:
+        return prefix
+    return prefix[:last_end]
@@ -0,0 +1,281 @@
+"""Builds the FAISS retriever over the medical knowledge base.
+
+Shared by the Streamlit app and the headless API; callers that want to show
+progress pass a ``progress(percent, message)`` callback. Each knowledge base is
+loaded once per process and shared by every session and API key; documents are
+then added, replaced or removed through the retriever's ``delta`` without a
+rebuild.
+"""
+import copy
+import os
+import threading
+from datetime import datetime
+
+from medassist.bm25 import BM25Index
+from medassist.client import cache_namespace_for, openai_base_url
+from medassist.delta_index import DeltaIndex, change_log_path
+from medassist.embedding_cache import CachedEmbeddings, get_embedding_store
+from medassist.faiss_index import build_params, configure_search, index_spec_from_env
+from medassist.index_cache import (index_cache_key, load_cached_index, load_cached_lexical_index,
+                                   load_cached_partitions, save_index, staging_dir)
+from medassist.ingest import (DOCUMENTS_DIR, INGEST_WORKERS, DocumentIngestor, count_pages, documents_fingerprint,
+                              find_documents, iter_page_tasks)
+from medassist.knowledge import corpus_digest, count_knowledge_records, iter_knowledge_records
+from medassist.partitions import PartitionedIndex
+from medassist.retrieval import HybridRetriever
+
+# Chunking and embedding settings (part of the on-disk index cache key)
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+LOCAL_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Fuse FAISS results with BM25 so exact drug names and dosages are not missed
+HYBRID_SEARCH = os.getenv("MEDASSIST_HYBRID_SEARCH", "1").lower() not in ("0", "false", "no")
+
+
+def embedding_model_name_for(use_openai_embeddings=False, api_key=None):
+    """Embedding model used for a configuration; OpenAI embeddings need a key"""
+    return OPENAI_EMBEDDING_MODEL if use_openai_embeddings and api_key else LOCAL_EMBEDDING_MODEL
+
+
+def embedding_endpoint_for(embedding_model_name):
+    """OPENAI_BASE_URL when OpenAI embeddings come from somewhere other than the public API, else None"""
+    return cache_namespace_for(openai_base_url()) if embedding_model_name == OPENAI_EMBEDDING_MODEL else None
+
+
+def create_embedding_model(embedding_model_name, api_key=None):
+    """LangChain embeddings for a model name; only that backend is imported"""
+    cache_namespace = embedding_model_name
+    if embedding_model_name == OPENAI_EMBEDDING_MODEL:
+        # langchain_openai pulls in the OpenAI SDK, sentence_transformer the model stack
+        from langchain_openai import OpenAIEmbeddings
+        embedding_model = OpenAIEmbeddings(
+            openai_api_key=api_key,
+            openai_api_base=openai_base_url(),
+            model=OPENAI_EMBEDDING_MODEL
+        )
+        endpoint = embedding_endpoint_for(embedding_model_name)
+        if endpoint:
+            cache_namespace = f"{embedding_model_name}@{endpoint}"
+    else:
+        from langchain_community.embeddings.sentence_transformer import SentenceTransformerEmbeddings
+        embedding_model = SentenceTransformerEmbeddings(
+            model_name=embedding_model_name
+        )
+
+    # Only chunks and queries never embedded before reach the model
+    return CachedEmbeddings(embedding_model, cache_namespace, get_embedding_store())
+
+
+# Loaded knowledge bases by kb_version, the on-disk cache key (corpus, splitter,
+# embedding model and index build settings). Every session and API key in the
+# process shares one copy of each index; only the query embedder is per caller.
+# Each retriever handed out holds a reference; an index is forgotten when the
+# last one is released.
+_shared_indexes = {}
+_shared_references = {}
+_shared_indexes_lock = threading.Lock()
+_build_locks = {}
+
+
+def _build_lock(kb_version):
+    with _shared_indexes_lock:
+        return _build_locks.setdefault(kb_version, threading.Lock())
+
+
+def _load_or_build_index(cache_key, document_files, embedding_model, embedding_model_name, index_spec, report):
+    """Load the index from the on-disk cache or build (and cache) it; returns the shared entry"""
+    vectorstore, cache_meta = load_cached_index(cache_key, embedding_model)
+    corpus_records = count_knowledge_records()
+    total_topics = corpus_records + len(document_files)
+
+    if vectorstore is not None:
+        report(80, "⚡ Loading cached FAISS index...")
+        configure_search(vectorstore.index, index_spec)
+        index_type = cache_meta.get("index_type", "flat")
+        lexical_index = load_cached_lexical_index(cache_key) if HYBRID_SEARCH else None
+        partitions = load_cached_partitions(cache_key)
+    else:
+        report(40, "✂️ Processing medical content..." if not document_files else "📚 Ingesting medical documents...")
+
+        # Corpus records and document pages are split and embedded in batches as they stream in;
+        # files are parsed in worker processes, the built-in corpus inline. Chunk texts go
+        # straight to disk in the directory that becomes the cache entry.
+        page_counts = {path: count_pages(path) for path in document_files}
+        total_pages = corpus_records + sum(page_counts.values())
+        build_dir = staging_dir(cache_key)
+        ingestor = DocumentIngestor(embedding_model, index_spec, CHUNK_SIZE, CHUNK_OVERLAP,
+                                    workers=INGEST_WORKERS if document_files else 1, directory=build_dir)
+        vectorstore = ingestor.ingest(iter_page_tasks(document_files, iter_knowledge_records(), page_counts),
+                                      total_pages,
+                                      progress=lambda percent, message: report(40 + percent * 2 // 5, message))
+        built_spec = ingestor.spec
+        total_chunks = ingestor.chunks
+
+    if cache_meta is None:
+        index_type = built_spec["type"]
+        lexical_index = BM25Index.from_vectorstore(vectorstore) if HYBRID_SEARCH else None
+        partitions = PartitionedIndex.from_vectorstore(vectorstore, built_spec)
+
+        try:
+            save_index(cache_key, vectorstore, {
+                "total_chunks": total_chunks,
+                "total_topics": total_topics,
+                "embedding_model": embedding_model_name,
+                "chunk_size": CHUNK_SIZE,
+                "chunk_overlap": CHUNK_OVERLAP,
+                "index_type": index_type,
+                "index_spec": built_spec,
+                "created_at": datetime.now().isoformat()
+            }, lexical_index, partitions, build_dir)
+        except OSError:
+            # A read-only filesystem only costs us the warm-start speedup
+            pass
+        else:
+            # Serve from the saved entry so the FAISS index, BM25 postings and sub-indexes are memory-mapped too
+            cached, _ = load_cached_index(cache_key, embedding_model)
+            if cached is not None:
+                vectorstore = cached
+                configure_search(vectorstore.index, built_spec)
+                lexical_index = load_cached_lexical_index(cache_key) if HYBRID_SEARCH else None
+                partitions = load_cached_partitions(cache_key)
+
+    if HYBRID_SEARCH and lexical_index is None:
+        # Cached before hybrid search was enabled
+        lexical_index = BM25Index.from_vectorstore(vectorstore)
+
+    if partitions is None:
+        # Missing or unreadable sub-indexes are rebuilt from the main index
+        partitions = PartitionedIndex.from_vectorstore(vectorstore, index_spec)
+    else:
+        partitions.configure(index_spec)
+
+    # Document upserts and deletes made since this index was built (see medassist.delta_index)
+    delta = DeltaIndex(vectorstore, lexical_index, CHUNK_SIZE, CHUNK_OVERLAP, change_log_path(cache_key))
+    if delta.replay():
+        report(90, f"🔁 Applied {delta.revision} document update(s)...")
+
+    return {
+        "vectorstore": vectorstore,
+        "lexical_index": lexical_index,
+        "delta": delta,
+        "partitions": partitions,
+        "embedding_model_name": embedding_model_name,
+        "index_type": index_type,
+        "total_topics": total_topics,
+    }
+
+
+def index_stats(shared, kb_version):
+    """Knowledge-base stats, read from a shared index rather than from whoever built it"""
+    embedding_model_name = shared["embedding_model_name"]
+    stats = {
+        "base_topics": shared["total_topics"],
+        "embedding_model": "OpenAI" if embedding_model_name == OPENAI_EMBEDDING_MODEL else "SentenceTransformer",
+        "embedding_model_name": embedding_model_name,
+        "index_type": shared["index_type"],
+        "kb_version": kb_version,
+    }
+    return live_index_stats(stats, shared["delta"], shared["partitions"])
+
+
+def live_index_stats(stats, delta, partitions):
+    """``stats`` with the counts that document updates change re-read from ``delta``"""
+    delta_stats = delta.stats()
+    return dict(
+        stats,
+        total_chunks=delta_stats["base_chunks"] - delta_stats["base_chunks_deleted"] + delta_stats["delta_chunks"],
+        # Documents are only counted from the index once an update has loaded them
+        total_topics=stats["base_topics"] if delta_stats["documents"] is None else delta_stats["documents"],
+        kb_revision=delta_stats["revision"],
+        specialties=delta.snapshot.partition_counts(partitions)
+    )
+
+
+def _acquire_shared_index(kb_version):
+    """The shared entry for ``kb_version`` with one more reference taken, or None if not loaded"""
+    with _shared_indexes_lock:
+        shared = _shared_indexes.get(kb_version)
+        if shared is not None:
+            _shared_references[kb_version] = _shared_references.get(kb_version, 0) + 1
+        return shared
+
+
+def release_shared_index(kb_version):
+    """Drop a retriever's reference; the knowledge base is forgotten when no retriever references it"""
+    with _shared_indexes_lock:
+        references = _shared_references.get(kb_version, 0) - 1
+        if references > 0:
+            _shared_references[kb_version] = references
+        else:
+            _shared_references.pop(kb_version, None)
+            _shared_indexes.pop(kb_version, None)
+
+
+def _knowledge_base_inputs(use_openai_embeddings, api_key, document_paths):
+    """(kb_version, document files, embedding model name, index spec)"""
+    # Choose embedding model
+    embedding_model_name = embedding_model_name_for(use_openai_embeddings, api_key)
+
+    # PDF / text files ingested alongside the built-in topics (see medassist.ingest)
+    if document_paths is None:
+        document_paths = [DOCUMENTS_DIR] if DOCUMENTS_DIR else []
+    document_files = find_documents(document_paths)
+
+    # Flat by default; IVF / IVF-PQ / HNSW for large corpora (see medassist.faiss_index)
+    index_spec = index_spec_from_env()
+
+    # Reuse a previously built index when corpus, splitter, model and index type are unchanged
+    cache_key = index_cache_key(corpus_digest(), CHUNK_SIZE, CHUNK_OVERLAP, embedding_model_name,
+                                build_params(index_spec), documents_fingerprint(document_files),
+                                embedding_endpoint_for(embedding_model_name))
+    return cache_key, document_files, embedding_model_name, index_spec
+
+
+def current_kb_version(use_openai_embeddings=False, api_key=None, document_paths=None):
+    """kb_version that build_medical_retriever would serve now; hashes the inputs without embedding anything"""
+    return _knowledge_base_inputs(use_openai_embeddings, api_key, document_paths)[0]
+
+
+def build_medical_retriever(use_openai_embeddings=False, api_key=None, progress=None, document_paths=None):
+    """Retriever over the shared FAISS knowledge base (loaded or built once); returns (retriever, stats)
+
+    The retriever holds a reference to the shared index until ``release_shared_index(stats["kb_version"])``.
+    """
+    report = progress or (lambda percent, message: None)
+
+    report(20, "📄 Loading comprehensive medical knowledge...")
+
+    cache_key, document_files, embedding_model_name, index_spec = _knowledge_base_inputs(
+        use_openai_embeddings, api_key, document_paths)
+
+    # The API key is not part of the key: sessions with different keys share the index
+    with _build_lock(cache_key):
+        shared = _acquire_shared_index(cache_key)
+        if shared is None:
+            embedding_model = create_embedding_model(embedding_model_name, api_key)
+            shared = _load_or_build_index(cache_key, document_files, embedding_model, embedding_model_name,
+                                          index_spec, report)
+            with _shared_indexes_lock:
+                _shared_indexes[cache_key] = shared
+                _shared_references[cache_key] = 1
+
+    vectorstore = shared["vectorstore"]
+    if embedding_model_name == OPENAI_EMBEDDING_MODEL:
+        # Same index and docstore, but questions are embedded (and billed) with this caller's key
+        vectorstore = copy.copy(vectorstore)
+        vectorstore.embedding_function = create_embedding_model(embedding_model_name, api_key)
+
+    # Create retriever
+    retriever = HybridRetriever(
+        vectorstore=vectorstore,
+        search_type='similarity',
+        search_kwargs={'k': 4},
+        metadata={'kb_version': cache_key, 'embedding_model': embedding_model_name},
+        lexical_index=shared["lexical_index"],
+        delta=shared["delta"],
+        partitions=shared["partitions"]
+    )
+
+    return retriever, index_stats(shared, cache_key)
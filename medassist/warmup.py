@@ -0,0 +1,117 @@
+"""Background warm-up of the knowledge-base retriever.
+
+Loading (or, on a cold cache, embedding and building) the index takes seconds
+to minutes. A warm-up runs ``build_medical_retriever`` on a daemon thread as
+soon as the process starts serving, so the UI can render immediately, show the
+build progress and hold the first question until the index is ready instead of
+blocking every new replica's first visitor.
+
+One warm-up is kept per embedding configuration for the whole process, so all
+sessions share it.
+"""
+import threading
+import time
+
+
+class IndexWarmup:
+    """Builds the retriever on a background thread and reports its progress."""
+
+    def __init__(self, use_openai_embeddings=False, api_key=None):
+        self.use_openai_embeddings = use_openai_embeddings
+        self.api_key = api_key
+        self.state = "pending"
+        self.percent = 0
+        self.message = "⏳ Waiting to load the medical knowledge base..."
+        self.error = None
+        self.seconds = None
+        self._result = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="medassist-index-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def _report(self, percent, message):
+        with self._lock:
+            self.percent = percent
+            self.message = message
+
+    def _run(self):
+        start = time.perf_counter()
+        with self._lock:
+            self.state = "building"
+        self._report(5, "📦 Loading retrieval libraries...")
+        try:
+            # Imported here so FAISS, LangChain and the embedding model load off the UI thread
+            from medassist.vectorstore import build_medical_retriever
+            result = build_medical_retriever(self.use_openai_embeddings, self.api_key, progress=self._report)
+        except Exception as e:
+            with self._lock:
+                self.state = "failed"
+                self.error = e
+                self.seconds = time.perf_counter() - start
+        else:
+            with self._lock:
+                self._result = result
+                self.state = "ready"
+                self.percent = 100
+                self.message = "✅ Medical knowledge base ready!"
+                self.seconds = time.perf_counter() - start
+        finally:
+            self._ready.set()
+
+    def wait(self, timeout=None):
+        """Block until the build finished (or failed); False if ``timeout`` ran out first."""
+        return self._ready.wait(timeout)
+
+    def result(self, timeout=None):
+        """(retriever, stats), waiting for the build; re-raises a build failure."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError("knowledge base is still loading")
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+    def take(self, timeout=None):
+        """Like ``result``, but hands it over: the warm-up stops referencing the retriever.
+
+        The index registry takes the boot result this way so that a retired
+        generation is not kept alive by the warm-up.
+        """
+        result = self.result(timeout)
+        with self._lock:
+            self._result = None
+        return result
+
+    def status(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "percent": self.percent,
+                "message": self.message,
+                "error": str(self.error) if self.error is not None else None,
+                "seconds": self.seconds,
+            }
+
+
+_warmups = {}
+_warmups_lock = threading.Lock()
+
+
+def get_index_warmup(use_openai_embeddings=False, api_key=None):
+    """Process-wide warm-up for an embedding configuration, started on first request.
+
+    A failed build is retried by the next call instead of being kept forever.
+    """
+    # Without a key the local model is used, so the key only matters for OpenAI embeddings
+    key = (True, api_key) if use_openai_embeddings and api_key else (False, None)
+    with _warmups_lock:
+        warmup = _warmups.get(key)
+        if warmup is None or warmup.state == "failed":
+            warmup = _warmups[key] = IndexWarmup(*key)
+    return warmup.start()